@@ -0,0 +1,77 @@
+"""
+Answer canonicalization: turn what a player typed into the key answers are
+grouped by, so "Ice cream", "icecream" and "ice-creams" all match.
+
+    1. Unicode: NFKD, accents dropped, casefolded ("Crème" -> "creme")
+    2. Split into words on anything that isn't a letter or digit
+    3. Light stemming of plurals on each word ("creams" -> "cream")
+    4. Words joined with no separator ("ice cream" -> "icecream")
+    5. The phrase's own word dropped if the player typed it too
+       ("ice cream" for "_cream" -> "ice")
+    6. Optional synonym table (load_synonyms)
+
+The same answers come up in room after room, so results are cached by
+(phrase, raw answer).
+"""
+import functools
+import json
+import re
+import unicodedata
+
+CACHE_SIZE = 65536
+_WORDS = re.compile(r"[^\W_]+")
+
+synonyms = {"*": {}}  # {phrase or "*" for every phrase: {key: canonical key}}
+
+
+def fold(text):
+    text = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in text if not unicodedata.combining(c)).casefold()
+
+
+def stem(word):
+    """Strip a plural ending; deliberately timid, a wrong merge costs more than a missed one."""
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 4 and (word.endswith(("ches", "shes")) or (word.endswith("es") and word[-3] in "sxz")):
+        return word[:-2]
+    if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+
+def normalize(text):
+    """Steps 1-4: the phrase-independent part of the key."""
+    return "".join(stem(word) for word in _WORDS.findall(fold(text)))
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def canonical_answer(phrase, raw):
+    key = normalize(raw)
+    if not key:
+        return raw.strip().lower()  # nothing but punctuation; keep it as typed
+
+    blank = normalize(phrase)  # the given word, e.g. "cream" for "_cream"
+    if blank and key != blank:
+        if phrase.startswith("_") and key.endswith(blank):
+            key = key[:-len(blank)]
+        elif phrase.endswith("_") and key.startswith(blank):
+            key = key[len(blank):]
+
+    key = synonyms.get(phrase, {}).get(key, key)
+    return synonyms["*"].get(key, key)
+
+
+def load_synonyms(path):
+    """Load a JSON synonym table: {"*" or phrase: {"alias": "canonical", ...}, ...}.
+
+    Aliases and canonical forms go through the same normalization as answers,
+    so the table can be written in plain words.
+    """
+    with open(path, encoding="utf-8") as file:
+        table = json.load(file)
+    synonyms.clear()
+    synonyms["*"] = {}
+    for scope, pairs in table.items():
+        synonyms.setdefault(scope, {}).update({normalize(alias): normalize(canonical) for alias, canonical in pairs.items()})
+    canonical_answer.cache_clear()
@@ -0,0 +1,157 @@
+"""
+asyncio flavour of server.py: the same game (game.py) on python-socketio's
+AsyncServer, served as an ASGI app, with no eventlet monkey patching.
+
+    uvicorn asgi_server:app --host 0.0.0.0 --port 5000
+    python asgi_server.py
+
+Same events (both serve frontend.FrontEnd), same /metrics, same
+BLANK_SLATE_STORE persistence. Rooms always live in this process; sharding
+(BLANK_SLATE_SHARDS) is only in server.py.
+"""
+import asyncio
+import collections
+import inspect
+import logging
+import os
+import time
+
+import socketio
+
+import bulls_cows  # adds the Bulls & Cows events to game.handlers
+import game
+import telemetry
+import wire
+from frontend import EVENTS, FrontEnd
+from replay import FileReplayLog
+from store import LogRoomStore
+
+STORE_PATH = os.environ.get("BLANK_SLATE_STORE")
+REPLAY_PATH = os.environ.get("BLANK_SLATE_REPLAY")
+PORT = int(os.environ.get("BLANK_SLATE_PORT", "5000"))
+HUB_LAG_INTERVAL = 0.5
+
+sio = socketio.AsyncServer(async_mode="asgi", cors_allowed_origins="*", json=telemetry.CountingJSON,
+                           serializer=wire.WirePacket)
+
+
+class QueuedTransport:
+    """FrontEnd's transport (see frontend.py) for the AsyncServer, whose calls are coroutines.
+
+    FrontEnd is synchronous, so its calls wait here, and flush() awaits them
+    in the order they were made; it runs after every event and tick. Calls
+    made while a flush is under way are sent by that flush, still in order.
+    """
+
+    def __init__(self):
+        self.pending = collections.deque()  # [(method, args)]
+        self.lock = asyncio.Lock()
+
+    def emit(self, event, data, room):
+        self.pending.append((self.send, (event, data, room)))
+
+    def enter(self, sid, room):
+        self.pending.append((sio.enter_room, (sid, room)))
+
+    def leave(self, sid, room):
+        self.pending.append((sio.leave_room, (sid, room)))
+
+    @staticmethod
+    async def send(event, data, room):
+        await sio.emit(event, data, room=room)
+
+    async def flush(self):
+        async with self.lock:
+            while self.pending:
+                method, args = self.pending.popleft()
+                result = method(*args)
+                if inspect.isawaitable(result):  # enter/leave_room are coroutines in newer python-socketio releases
+                    await result
+
+
+transport = QueuedTransport()
+front = FrontEnd(transport)
+telemetry.register_room_gauges(front.room_stats)
+
+
+async def every(seconds, tick):
+    while True:
+        await asyncio.sleep(seconds)
+        tick()
+        await transport.flush()
+
+
+async def watch_loop_lag():
+    """Sleep on the event loop and record how much later than asked it wakes us up."""
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(HUB_LAG_INTERVAL)
+        telemetry.hub_lag_seconds.observe(max(time.perf_counter() - started - HUB_LAG_INTERVAL, 0.0))
+
+
+@sio.event
+async def connect(sid, environ):
+    front.connect(sid, environ.get("REMOTE_ADDR"))
+
+
+@sio.event
+async def disconnect(sid):
+    front.disconnect(sid)
+    await transport.flush()
+
+
+def handler(event):
+    async def on_event(sid, data):
+        front.handle(event, sid, data)
+        await transport.flush()
+    return on_event
+
+
+for event in EVENTS:
+    sio.on(event, handler=handler(event))
+
+
+async def metrics_app(scope, receive, send):
+    """Plain ASGI app for everything that isn't Socket.IO: /metrics, 404 otherwise."""
+    if scope["type"] != "http":
+        return
+    if scope["path"] == "/metrics":
+        status, body = 200, telemetry.render().encode("utf-8")
+    else:
+        status, body = 404, b"Not Found"
+    await send({"type": "http.response.start", "status": status,
+                "headers": [(b"content-type", b"text/plain; version=0.0.4")]})
+    await send({"type": "http.response.body", "body": body})
+
+
+background_tasks = []
+
+
+async def on_startup():
+    ticks = front.ticks()
+    if STORE_PATH:
+        # Flushed from the event loop, so it never runs in the middle of a handler
+        game.use_store(LogRoomStore(STORE_PATH, background=False))
+        ticks.append((game.store.flush_interval, game.store.flush))
+    if REPLAY_PATH:
+        game.use_replay(FileReplayLog(REPLAY_PATH))
+    for seconds, tick in ticks:
+        background_tasks.append(asyncio.ensure_future(every(seconds, tick)))
+    background_tasks.append(asyncio.ensure_future(watch_loop_lag()))
+
+
+async def on_shutdown():
+    for task in background_tasks:
+        task.cancel()
+    game.store.close()
+    game.replay.close()
+    front.stats.close()
+
+
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+app = socketio.ASGIApp(sio, other_asgi_app=metrics_app, on_startup=on_startup, on_shutdown=on_shutdown)
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host="0.0.0.0", port=PORT, log_level="warning")
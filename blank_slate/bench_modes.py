@@ -0,0 +1,86 @@
+"""
+Benchmark the eventlet server (server.py) against the asyncio one
+(asgi_server.py) on the same loadtest.py scenario.
+
+Each mode is started in turn on a free port, loaded, and stopped; the output
+is one JSON document with loadtest's results per mode.
+
+    python bench_modes.py --scenario standard --output modes.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import loadtest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+MODES = {
+    "eventlet": [sys.executable, os.path.join(HERE, "server.py")],
+    "asyncio": [sys.executable, os.path.join(HERE, "asgi_server.py")],
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, timeout=15):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"server did not start listening on port {port}")
+
+
+def bench(mode, scenario, seed, connect_concurrency):
+    port = free_port()
+    env = dict(os.environ, BLANK_SLATE_PORT=str(port), BLANK_SLATE_SHARDS="0",
+               BLANK_SLATE_ADDRESS_RATE="0", BLANK_SLATE_ROOMS_PER_ADDRESS="0")  # every bot is on 127.0.0.1
+    env.pop("BLANK_SLATE_STORE", None)  # compare the game loops, not the disk
+    server = subprocess.Popen(MODES[mode], cwd=HERE, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for_port(port)
+        url = f"http://127.0.0.1:{port}"
+        return asyncio.run(loadtest.run(url, scenario, seed, [server.pid], connect_concurrency))
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", choices=sorted(loadtest.SCENARIOS), default="smoke")
+    parser.add_argument("--rooms", type=int, help="override the scenario's number of rooms")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--modes", nargs="+", choices=sorted(MODES), default=sorted(MODES))
+    parser.add_argument("--connect-concurrency", type=int, default=200)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    scenario = loadtest.SCENARIOS[args.scenario]
+    if args.rooms:
+        scenario = scenario._replace(rooms=args.rooms)
+
+    results = {"scenario": scenario._asdict(), "seed": args.seed, "modes": {}}
+    for mode in args.modes:
+        results["modes"][mode] = bench(mode, scenario, args.seed, args.connect_concurrency)
+
+    text = json.dumps(results, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Compare the JSON and msgpack wire encodings (wire.py) on real game traffic.
+
+Plays `--rooms` four-player rooms through whole games with game.py in this
+process (no server, no sockets), keeps every message the game sends, and
+then encodes it the way the server would for each encoding: once per emit,
+with the WirePacket serializer. Decoding is timed the way a client does it.
+Bytes count what reaches every client, plus the players' submit_answer
+requests, and are reported per round per room.
+
+    python bench_wire.py --rooms 10000 --output wire.json
+"""
+import argparse
+import json
+import random
+import time
+
+from socketio import packet
+
+import game
+import wire
+from loadtest import VOCABULARY
+
+PLAYERS = 4
+
+
+def play(rooms, seed):
+    """Run every room through one game; returns (messages, requests, rounds played).
+
+    messages are (event, data, room_code, recipients); requests are submit_answer payloads.
+    """
+    rng = random.Random(seed)
+    messages = []
+    requests = []
+    rounds = 0
+
+    def collect():
+        for event, data, room_code in game.drain():
+            room = game.store.get(room_code)
+            messages.append((event, data, room_code, len(room.scores) if room is not None else 1))
+
+    for r in range(rooms):
+        room_code = f"room{r}"
+        for p in range(PLAYERS):
+            game.join({"name": f"player{p}_{rng.randrange(10000)}", "room": room_code})
+        collect()
+        room = game.store.get(room_code)
+        while room.round is not None:
+            rounds += 1
+            for player_name in list(room.scores):
+                request = {"room": room_code, "name": player_name, "answer": rng.choice(VOCABULARY)}
+                requests.append(request)
+                game.submit_answer(request)
+            collect()
+    return messages, requests, rounds
+
+
+def encode(messages, requests, encoding):
+    """Encode every message once, as the server does; returns (frames, request frames, seconds for the messages)."""
+    packer = wire.Packer()
+    started = time.perf_counter()
+    if encoding == "msgpack":
+        frames = [wire.WirePacket(packet.EVENT, data=[event, packer.pack(event, data, room_code)]).encode()
+                  for event, data, room_code, _ in messages]
+        seconds = time.perf_counter() - started
+        request_frames = [wire.WirePacket(packet.EVENT, data=["submit_answer", wire.pack_request(request)]).encode()
+                          for request in requests]
+    else:
+        frames = [wire.WirePacket(packet.EVENT, data=[event, data]).encode() for event, data, _, _ in messages]
+        seconds = time.perf_counter() - started
+        request_frames = [wire.WirePacket(packet.EVENT, data=["submit_answer", request]).encode()
+                          for request in requests]
+    return frames, request_frames, seconds
+
+
+def decode(messages, frames, encoding):
+    """Decode every frame once, as one client per room would; returns seconds."""
+    unpackers = {}
+    started = time.perf_counter()
+    for (_, _, room_code, _), frame in zip(messages, frames):
+        event, data = wire.WirePacket(encoded_packet=frame).data
+        if encoding == "msgpack":
+            if room_code not in unpackers:
+                unpackers[room_code] = wire.Unpacker()
+            unpackers[room_code].unpack(event, data)
+    return time.perf_counter() - started
+
+
+def bench(rooms, seed):
+    messages, requests, rounds = play(rooms, seed)
+    results = {"rooms": rooms, "rounds": rounds, "messages": len(messages), "requests": len(requests),
+               "encodings": {}}
+    for encoding in wire.ENCODINGS:
+        frames, request_frames, encode_seconds = encode(messages, requests, encoding)
+        decode_seconds = decode(messages, frames, encoding)
+        # A text frame also carries engine.io's "4" (message) prefix; binary frames carry nothing extra
+        overhead = 0 if encoding == "msgpack" else 1
+        sent = sum((len(frame) + overhead) * recipients for frame, (_, _, _, recipients) in zip(frames, messages))
+        received = sum(len(frame) + overhead for frame in request_frames)
+        results["encodings"][encoding] = {
+            "bytes_per_round": round((sent + received) / rounds, 1),
+            "sent_bytes_per_round": round(sent / rounds, 1),
+            "received_bytes_per_round": round(received / rounds, 1),
+            "encode_us_per_message": round(encode_seconds / len(messages) * 1e6, 3),
+            "decode_us_per_message": round(decode_seconds / len(messages) * 1e6, 3),
+            "encode_seconds": round(encode_seconds, 3),
+            "decode_seconds": round(decode_seconds, 3),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rooms", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    text = json.dumps(bench(args.rooms, args.seed), indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+"""
+Bulls & Cows as a second game on the blank slate server, next to game.py's
+rooms and driven the same way: handlers queue (event, data, room) messages in
+game.outbox, and rooms live in game.store.
+
+Two modes, picked by whoever opens the room:
+
+    race  the server draws a word; `players` players (default 2) all guess
+          it and the first to hit every bull wins. Each player sees their
+          own bulls and cows; the room only sees everyone's progress.
+    duel  two players: the first to join sets the secret, the second
+          guesses it, and both see every guess.
+
+Guesses are not scored one by one. Every guess that arrives is queued and on
+the next timer tick the whole queue, from every room in the process, is
+scored in one vectorized NumPy pass (evaluate()). Scored guesses go into the
+room's packed history (room.GuessRoom).
+
+Secrets and guesses must be in the Bulls & Cows app's word list
+(BULLS_COWS_WORDS, default ../bulls_&_cows/word_list.txt).
+
+Client events:
+    join_bulls_cows  {room, name, mode, length, genre?, players?}
+    set_secret       {room, name, secret}    duel, code maker only
+    submit_guess     {room, name, guess}
+The front end adds each client's "sid" so private replies can reach it.
+"""
+import os
+
+import numpy as np
+
+import game
+from phrases import BULLS_COWS_DIR  # and puts it on sys.path, for its lexicon.py
+from room import GuessRoom
+from telemetry import log
+from lexicon import Lexicon  # noqa: E402
+
+WORD_FILE = os.environ.get("BULLS_COWS_WORDS", os.path.join(BULLS_COWS_DIR, "word_list.txt"))
+lexicon = Lexicon(WORD_FILE)
+
+MODES = ("race", "duel")
+MAX_RACE_PLAYERS = 16
+MAX_GUESSES = 20  # per player; a duel breaker who runs out loses
+GAME_SECONDS = 5 * 60  # a game ends this long after it starts, solved or not
+
+pending = []  # [(room_code, player_name, guess bytes, sid)] queued for the next scoring pass
+scoring_timer = None  # the timers.Timer for that pass, while one is due
+
+
+def evaluate(secrets, guesses):
+    """Bulls and cows of each row of `guesses` against the same row of `secrets`.
+
+    Both are (n, length) uint8 arrays of letters; returns two length-n arrays.
+    """
+    bulls = (secrets == guesses).sum(axis=1)
+    letters = np.arange(ord("a"), ord("z") + 1, dtype=np.uint8)
+    secret_counts = (secrets[:, :, None] == letters).sum(axis=1)
+    guess_counts = (guesses[:, :, None] == letters).sum(axis=1)
+    common = np.minimum(secret_counts, guess_counts).sum(axis=1)
+    return bulls, common - bulls
+
+
+def error(sid, message):
+    game.emit("bulls_cows_error", {"message": message}, room=sid)
+
+
+def send_state(room):
+    game.emit("bulls_cows_state", {
+        "mode": room.mode,
+        "length": room.length,
+        "genre": room.genre,
+        "players": list(room.scores),
+        "maker": room.maker,
+        "status": room.status,
+        "max_guesses": MAX_GUESSES,
+        "seconds": GAME_SECONDS,
+    }, room=room.code)
+
+
+def join(data):
+    player_name = data["name"]
+    room_code = data["room"]
+
+    room = game.store.get(room_code)
+    if room is None:
+        mode = data.get("mode", "race")
+        length = game.int_field(data, "length", 5)
+        players = game.int_field(data, "players", 2)
+        genre = data.get("genre") or None
+        if mode not in MODES:
+            return error(data["sid"], f"Unknown mode {mode!r}")
+        if length is None or players is None:
+            return error(data["sid"], "Word length and players must be numbers")
+        if not lexicon.count(length, genre):
+            return error(data["sid"], f"No {length}-letter words" + (f" in {genre}" if genre else ""))
+        capacity = 2 if mode == "duel" else max(1, min(players, MAX_RACE_PLAYERS))
+        room = GuessRoom(room_code, mode, length, genre, capacity)
+        game.timers.schedule(game.ROOM_IDLE_SECONDS, game.evict_if_idle, room_code)
+        game.emit("room_opened", {"room": room_code}, room=room_code)
+    elif not isinstance(room, GuessRoom):
+        return error(data["sid"], "That room is playing another game")
+
+    if not room.has_player(player_name):
+        if len(room.scores) >= room.capacity:
+            return error(data["sid"], "That room is full")
+        room.add_player(player_name)
+        if room.mode == "duel" and room.maker is None:
+            room.maker = player_name
+    room.last_active = game.timers.clock()
+    log("player_joined", room=room_code, player=player_name, game="bulls_cows")
+
+    if room.status == "waiting" and len(room.scores) == room.capacity:
+        if room.mode == "race":
+            room.secret = lexicon.random_word(room.length, room.genre).encode("ascii")
+            start(room)
+        else:
+            room.status = "secret"
+    send_state(room)
+    game.store.put(room)
+
+
+def set_secret(data):
+    room = game.store.get(data["room"])
+    if not isinstance(room, GuessRoom) or room.status != "secret" or data["name"] != room.maker:
+        return
+    secret = data["secret"].strip().lower()
+    if len(secret) != room.length or secret not in lexicon:
+        return error(data["sid"], f"Pick a {room.length}-letter word from the word list")
+    room.secret = secret.encode("ascii")
+    room.last_active = game.timers.clock()
+    start(room)
+    send_state(room)
+    game.store.put(room)
+
+
+def start(room):
+    room.status = "playing"
+    room.deadline = game.timers.schedule(GAME_SECONDS, game_timed_out, room.code)
+
+
+def restore_deadline(room):
+    """A recovered game that was being played gets a fresh GAME_SECONDS (see game.use_store)."""
+    if room.status == "playing":
+        room.deadline = game.timers.schedule(GAME_SECONDS, game_timed_out, room.code)
+
+
+def submit_guess(data):
+    global scoring_timer
+    room = game.store.get(data["room"])
+    player_name = data["name"]
+    if not isinstance(room, GuessRoom) or room.status != "playing" or not room.has_player(player_name):
+        return
+    if room.mode == "duel" and player_name == room.maker:
+        return
+    guess = data["guess"].strip().lower()
+    if len(guess) != room.length or guess not in lexicon:
+        return error(data["sid"], f"'{guess}' is not a {room.length}-letter word from the word list")
+    if room.scores[player_name] >= MAX_GUESSES:
+        return error(data["sid"], "You are out of guesses")
+
+    room.scores[player_name] += 1
+    room.last_active = game.timers.clock()
+    pending.append((room.code, player_name, guess.encode("ascii"), data["sid"]))
+    if scoring_timer is None:
+        scoring_timer = game.timers.schedule(0, score_pending)  # next tick
+
+
+def score_pending():
+    """Score every queued guess, grouped by word length, one NumPy pass per length."""
+    global scoring_timer
+    scoring_timer = None
+    batch = pending[:]
+    del pending[:]
+
+    rooms = {}
+    by_length = {}  # {length: [batch indices]}
+    for i, (room_code, _, guess, _) in enumerate(batch):
+        room = rooms[room_code] = game.store.get(room_code)
+        if isinstance(room, GuessRoom) and room.status == "playing":
+            by_length.setdefault(len(guess), []).append(i)
+
+    results = {}  # {batch index: (bulls, cows)}
+    for length, indices in by_length.items():
+        secrets = np.frombuffer(b"".join(rooms[batch[i][0]].secret for i in indices), dtype=np.uint8)
+        guesses = np.frombuffer(b"".join(batch[i][2] for i in indices), dtype=np.uint8)
+        bulls, cows = evaluate(secrets.reshape(-1, length), guesses.reshape(-1, length))
+        results.update(zip(indices, zip(bulls.tolist(), cows.tolist())))
+
+    changed = set()
+    scored = {}  # {(room_code, player_name): guesses of theirs scored so far}
+    for i, (room_code, player_name, guess, sid) in enumerate(batch):
+        room = rooms[room_code]
+        if i not in results or room.status != "playing":
+            continue  # room gone, or someone already won earlier in this batch
+        bulls, cows = results[i]
+        player_index = list(room.scores).index(player_name)
+        key = (room_code, player_name)
+        if key not in scored:
+            scored[key] = room.players.count(player_index)
+        scored[key] += 1
+        room.add_guess(player_index, guess, bulls, cows)
+        changed.add(room_code)
+
+        result = {"name": player_name, "guess": guess.decode("ascii"), "bulls": bulls, "cows": cows,
+                  "guesses": scored[key]}
+        if room.mode == "race":
+            game.emit("guess_result", result, room=sid)
+            game.emit("race_progress", {"name": player_name, "guesses": scored[key], "bulls": bulls},
+                      room=room.code)
+        else:
+            game.emit("guess_result", result, room=room.code)
+
+        if bulls == room.length:
+            finish(room, player_name)
+
+    for room_code in changed:
+        room = rooms[room_code]
+        guessers = [guesses for name, guesses in room.scores.items() if name != room.maker]
+        if room.status == "playing" and all(guesses >= MAX_GUESSES for guesses in guessers):
+            finish(room, room.maker)  # nobody has a guess left: the maker wins a duel, nobody wins a race
+        game.store.put(room)
+
+
+def game_timed_out(room_code):
+    room = game.store.get(room_code)
+    if not isinstance(room, GuessRoom) or room.status != "playing":
+        return
+    room.deadline = None
+    finish(room, room.maker)
+    game.store.put(room)
+
+
+def finish(room, winner):
+    seconds = GAME_SECONDS
+    if room.deadline is not None:
+        seconds = max(0, GAME_SECONDS - round(room.deadline.expires * game.timers.tick - game.timers.clock()))
+    room.status = "over"
+    room.winner = winner
+    room.cancel_timers()
+    # "solved": the winner guessed the word (rather than a duel's maker winning because nobody did)
+    game.emit("bulls_cows_over", {"winner": winner, "secret": room.secret.decode("ascii"),
+                                  "guesses": dict(room.scores), "seconds": seconds,
+                                  "solved": winner is not None and winner != room.maker}, room=room.code)
+    log("game_over", room=room.code, game="bulls_cows", winner=winner, guesses=room.scores)
+    game.timers.schedule(game.FINISHED_ROOM_SECONDS, game.evict_room, room.code)
+
+
+handlers = {"join_bulls_cows": join, "set_secret": set_secret, "submit_guess": submit_guess}
+game.handlers.update(handlers)
+game.deadline_restorers[GuessRoom] = restore_deadline
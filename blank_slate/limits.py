@@ -0,0 +1,172 @@
+"""
+Flood control for the Socket.IO front end (frontend.py).
+
+Every client event goes through RateLimiter.check() before any game code
+runs: a token bucket per connection and a bigger one per address (so
+reconnecting or opening more sockets doesn't buy more), each refilled at a
+steady rate. Events that set up state (joining, creating rooms) cost more
+than an answer. An event over the rate is turned away with a "rate_limited"
+event telling the client when to try again, instead of queueing up and
+slowing down every other room. A check is two dict lookups and some
+arithmetic.
+
+RoomQuota caps how many rooms one address has open at a time: a join_room
+with a code nobody is using counts against its address straight away, is
+confirmed when the game reports the room created ("room_opened") and is
+released when the game drops it ("room_closed", see game.evict_room). An
+open the game refused (or that failed) is released after OPEN_CONFIRM_SECONDS.
+
+RoomBacklog bounds the events waiting for one room when rooms live on shard
+processes (sharding.ShardPool): past ROOM_QUEUE_LIMIT unhandled events, a
+room's clients are told it is busy rather than growing the shard's queue.
+
+Every limit can be set from the environment (BLANK_SLATE_RATE, ...). An
+address rate or room cap of 0 turns that check off, e.g. for load tests,
+whose bots all connect from one address (bench_modes.py does this).
+"""
+import os
+import time
+
+RATE = float(os.environ.get("BLANK_SLATE_RATE", "10"))  # event cost a connection may keep up per second
+BURST = float(os.environ.get("BLANK_SLATE_BURST", "20"))  # and spend at once after being quiet
+# The same, for every connection from one address together; 0 for no per-address limit
+ADDRESS_RATE = float(os.environ.get("BLANK_SLATE_ADDRESS_RATE", "40"))
+ADDRESS_BURST = float(os.environ.get("BLANK_SLATE_ADDRESS_BURST", "80"))
+EVENT_COSTS = {"join_room": 5, "join_bulls_cows": 5, "quick_play": 5, "spectate": 5,
+               "get_high_scores": 5, "get_stats": 2}  # everything else costs 1
+ROOMS_PER_ADDRESS = int(os.environ.get("BLANK_SLATE_ROOMS_PER_ADDRESS", "10"))  # 0 for no cap
+OPEN_CONFIRM_SECONDS = 10.0
+ROOM_QUEUE_LIMIT = int(os.environ.get("BLANK_SLATE_ROOM_QUEUE", "64"))
+
+
+class TokenBuckets:
+    """A token bucket per key; buckets that have filled up again are dropped by prune()."""
+
+    def __init__(self, rate, burst, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.buckets = {}  # {key: [tokens, time of last refill]}
+
+    def __len__(self):
+        return len(self.buckets)
+
+    def available(self, key, now):
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            return self.burst
+        return min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+
+    def spend(self, key, tokens, now):
+        self.buckets[key] = [tokens, now]
+
+    def prune(self):
+        """Forget buckets that are full again; a fresh one would be the same."""
+        now = self.clock()
+        full = [key for key, (tokens, stamp) in self.buckets.items()
+                if tokens + (now - stamp) * self.rate >= self.burst]
+        for key in full:
+            del self.buckets[key]
+
+
+class RateLimiter:
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.connections = TokenBuckets(RATE, BURST, clock)  # by sid
+        self.addresses = TokenBuckets(ADDRESS_RATE, ADDRESS_BURST, clock) if ADDRESS_RATE > 0 else None  # by address
+        self.address_of = {}  # {sid: address}
+
+    def connect(self, sid, address):
+        self.address_of[sid] = address
+
+    def disconnect(self, sid):
+        self.address_of.pop(sid, None)
+        self.connections.buckets.pop(sid, None)
+
+    def check(self, sid, event):
+        """Charge `event` to the connection and its address; returns 0 if it may go ahead,
+        otherwise the seconds until it would be allowed (nothing is charged then)."""
+        cost = EVENT_COSTS.get(event, 1)
+        now = self.clock()
+        tokens = self.connections.available(sid, now)
+        if self.addresses is None:
+            if tokens < cost:
+                return (cost - tokens) / self.connections.rate
+            self.connections.spend(sid, tokens - cost, now)
+            return 0
+        address = self.address_of.get(sid)
+        address_tokens = self.addresses.available(address, now)
+        if tokens < cost or address_tokens < cost:
+            return max((cost - tokens) / self.connections.rate, (cost - address_tokens) / self.addresses.rate)
+        self.connections.spend(sid, tokens - cost, now)
+        self.addresses.spend(address, address_tokens - cost, now)
+        return 0
+
+    def prune(self):
+        self.connections.prune()
+        if self.addresses is not None:
+            self.addresses.prune()
+
+
+class RoomQuota:
+    def __init__(self, limit=ROOMS_PER_ADDRESS, clock=time.monotonic):
+        self.limit = limit
+        self.clock = clock
+        self.creators = {}  # {room_code: address that opened it, or None for the server's own rooms}
+        self.open_rooms = {}  # {address: rooms it has open, confirmed or not}
+        self.unconfirmed = {}  # {room_code: when it was claimed}, oldest first, until the game reports it opened
+
+    def claim(self, room_code, address):
+        """A join to `room_code`; returns False if it would open a room `address` has no quota left for."""
+        if self.limit <= 0 or room_code in self.creators:
+            return True
+        if address is None:
+            self.creators[room_code] = None  # the server's own room, on nobody's quota
+            return True
+        if self.open_rooms.get(address, 0) >= self.limit:
+            return False
+        self.open_rooms[address] = self.open_rooms.get(address, 0) + 1
+        self.unconfirmed[room_code] = self.clock()
+        self.creators[room_code] = address
+        return True
+
+    def opened(self, room_code):
+        """The game created the room: it stays on its creator's quota until release()."""
+        self.unconfirmed.pop(room_code, None)
+
+    def prune(self):
+        """Give back the slots of opens the game never confirmed (it refused them, or the handler failed)."""
+        expired = self.clock() - OPEN_CONFIRM_SECONDS
+        while self.unconfirmed:
+            room_code, claimed = next(iter(self.unconfirmed.items()))
+            if claimed > expired:
+                break
+            self.release(room_code)
+
+    def release(self, room_code):
+        """The room is gone."""
+        self.unconfirmed.pop(room_code, None)
+        address = self.creators.pop(room_code, None)
+        if address is not None:
+            self.open_rooms[address] -= 1
+            if not self.open_rooms[address]:
+                del self.open_rooms[address]
+
+
+class RoomBacklog:
+    def __init__(self, limit=ROOM_QUEUE_LIMIT):
+        self.limit = limit
+        self.pending = {}  # {room_code: events sent to its shard and not handled yet}
+
+    def has_room_for(self, room_code):
+        return self.pending.get(room_code, 0) < self.limit
+
+    def add(self, room_code):
+        self.pending[room_code] = self.pending.get(room_code, 0) + 1
+
+    def done(self, room_code):
+        count = self.pending.get(room_code, 0) - 1
+        if count > 0:
+            self.pending[room_code] = count
+        else:
+            self.pending.pop(room_code, None)
@@ -0,0 +1,238 @@
+"""
+Load generator for the blank slate server.
+
+Plays many rooms at once against a running server, each with its own bot
+players on python-socketio's AsyncClient: join_room, then for every phrase
+each bot submits an answer. Measures how long the server takes from the last
+answer of a round to round_end and to the next new_phrase, and writes the
+results as JSON.
+
+    BLANK_SLATE_ADDRESS_RATE=0 BLANK_SLATE_ROOMS_PER_ADDRESS=0 python server.py &
+    python loadtest.py --scenario standard --server-pid $! --output results.json
+    python loadtest.py --scenario standard --baseline results.json   # exit 1 on regression
+
+Every bot connects from this machine's address, so start the server without
+its per-address limits (limits.py) as above; events the server still turns
+away are counted under errors["rate_limited"].
+
+Needs the client's socketio package plus aiohttp for the asyncio client.
+"""
+import argparse
+import asyncio
+import collections
+import json
+import random
+import sys
+import time
+
+import socketio
+
+Scenario = collections.namedtuple("Scenario", "name rooms players rounds think_ms timeout_s")
+
+SCENARIOS = {
+    # Quick check that the harness and server talk to each other
+    "smoke": Scenario("smoke", rooms=10, players=4, rounds=3, think_ms=0, timeout_s=30),
+    # Many rooms with players taking a moment to answer
+    "standard": Scenario("standard", rooms=1000, players=4, rounds=5, think_ms=200, timeout_s=120),
+    # Everyone answers immediately: worst case for the answer hot path
+    "burst": Scenario("burst", rooms=2500, players=4, rounds=3, think_ms=0, timeout_s=180),
+}
+
+# Bots answer from a small vocabulary so rounds have pairs, crowds and unique answers
+VOCABULARY = ["cake", "ball", "room", "cream", "top", "light", "box"]
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = {"round_end": [], "new_phrase": []}  # seconds
+        self.answers = 0
+        self.rounds = 0
+        self.games_finished = 0
+        self.errors = collections.Counter()
+
+    def record(self, kind, seconds):
+        self.latencies[kind].append(seconds)
+
+    def summary(self, kind):
+        values = sorted(self.latencies[kind])
+        if not values:
+            return {"count": 0}
+
+        def percentile(p):
+            return round(values[min(len(values) - 1, int(p / 100 * len(values)))] * 1000, 3)
+
+        return {"count": len(values), "p50_ms": percentile(50), "p99_ms": percentile(99), "max_ms": round(values[-1] * 1000, 3)}
+
+
+def rss_kb(pids):
+    """Resident memory of the server processes, from /proc (Linux only); None if unknown."""
+    if not pids:
+        return None
+    total = 0
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/status") as file:
+                for line in file:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1])
+        except OSError:
+            return None
+    return total
+
+
+async def play_room(index, url, scenario, seed, run_id, stats, connect_limit, joined):
+    rng = random.Random(f"{seed}-{index}")
+    room_code = f"{scenario.name}-{run_id}-{index}"
+    names = [f"bot{index}-{seat}" for seat in range(scenario.players)]
+    clients = [socketio.AsyncClient(reconnection=False) for _ in names]
+    state = {"rounds": 0, "last_submit": None}
+    finished = asyncio.Event()
+
+    async def play_round():
+        for client, name in zip(clients, names):
+            if scenario.think_ms:
+                await asyncio.sleep(rng.uniform(0, scenario.think_ms) / 1000)
+            state["last_submit"] = time.perf_counter()
+            await client.emit("submit_answer", {"name": name, "room": room_code, "answer": rng.choice(VOCABULARY)})
+            stats.answers += 1
+
+    # Only the first bot's socket drives the room; every bot gets the same broadcasts
+    async def on_new_phrase(data):
+        if state["last_submit"] is not None:
+            stats.record("new_phrase", time.perf_counter() - state["last_submit"])
+        if state["rounds"] >= scenario.rounds:
+            finished.set()
+            return
+        asyncio.ensure_future(play_round())
+
+    async def on_round_end(data):
+        if state["last_submit"] is not None:
+            stats.record("round_end", time.perf_counter() - state["last_submit"])
+        state["rounds"] += 1
+        stats.rounds += 1
+
+    async def on_game_over(data):
+        stats.games_finished += 1
+        finished.set()
+
+    async def on_rate_limited(data):
+        stats.errors["rate_limited"] += 1
+
+    for client in clients:
+        client.on("rate_limited", on_rate_limited)
+    clients[0].on("new_phrase", on_new_phrase)
+    clients[0].on("round_end", on_round_end)
+    clients[0].on("game_over", on_game_over)
+
+    try:
+        for client in clients:
+            async with connect_limit:
+                await client.connect(url, transports=["websocket"])
+        joined.append(room_code)
+        for client, name in zip(clients, names):
+            await client.emit("join_room", {"name": name, "room": room_code})
+        await asyncio.wait_for(finished.wait(), scenario.timeout_s)
+    except asyncio.TimeoutError:
+        stats.errors["timeout"] += 1
+    except socketio.exceptions.ConnectionError:
+        stats.errors["connect"] += 1
+    finally:
+        for client in clients:
+            if client.connected:
+                await client.disconnect()
+
+
+async def run(url, scenario, seed, server_pids, connect_concurrency):
+    stats = Stats()
+    run_id = int(time.time())  # fresh room codes every run, so old rooms are never reused
+    connect_limit = asyncio.Semaphore(connect_concurrency)
+    joined = []
+
+    rss_before = rss_kb(server_pids)
+    started = time.perf_counter()
+    rooms = [
+        asyncio.ensure_future(play_room(index, url, scenario, seed, run_id, stats, connect_limit, joined))
+        for index in range(scenario.rooms)
+    ]
+
+    # Sample server memory once every room is in, while they are all still live
+    while len(joined) < scenario.rooms and not all(room.done() for room in rooms):
+        await asyncio.sleep(0.1)
+    rss_loaded = rss_kb(server_pids)
+
+    await asyncio.gather(*rooms)
+    duration = time.perf_counter() - started
+
+    memory_per_room = None
+    if rss_before is not None and rss_loaded is not None and joined:
+        memory_per_room = round((rss_loaded - rss_before) / len(joined), 2)
+
+    return {
+        "scenario": scenario._asdict(),
+        "seed": seed,
+        "url": url,
+        "duration_s": round(duration, 3),
+        "rooms_joined": len(joined),
+        "answers": stats.answers,
+        "rounds": stats.rounds,
+        "games_finished": stats.games_finished,
+        "answers_per_s": round(stats.answers / duration, 1),
+        "rounds_per_s": round(stats.rounds / duration, 1),
+        "latency": {kind: stats.summary(kind) for kind in stats.latencies},
+        "server_rss_kb": {"before": rss_before, "loaded": rss_loaded},
+        "memory_per_room_kb": memory_per_room,
+        "errors": dict(stats.errors),
+    }
+
+
+def regressions(results, baseline, tolerance):
+    """Ways `results` is worse than `baseline` by more than `tolerance` (a fraction)."""
+    problems = []
+    for kind in ("round_end", "new_phrase"):
+        old = baseline["latency"][kind].get("p99_ms")
+        new = results["latency"][kind].get("p99_ms")
+        if old and new and new > old * (1 + tolerance):
+            problems.append(f"{kind} p99 {new} ms vs {old} ms")
+    if results["answers_per_s"] < baseline["answers_per_s"] * (1 - tolerance):
+        problems.append(f"throughput {results['answers_per_s']} answers/s vs {baseline['answers_per_s']}")
+    if results["errors"] and not baseline["errors"]:
+        problems.append(f"errors {results['errors']}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:5000")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="smoke")
+    parser.add_argument("--rooms", type=int, help="override the scenario's number of rooms")
+    parser.add_argument("--rounds", type=int, help="override the scenario's rounds per room")
+    parser.add_argument("--think-ms", type=int, help="override the scenario's max think time per answer")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--server-pid", type=int, action="append", default=[], help="server (or shard) pid to measure; repeatable")
+    parser.add_argument("--connect-concurrency", type=int, default=200)
+    parser.add_argument("--output", help="write the JSON results here as well as to stdout")
+    parser.add_argument("--baseline", help="JSON results to compare against; exit 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="allowed regression vs the baseline (0.1 = 10%%)")
+    args = parser.parse_args()
+
+    overrides = {"rooms": args.rooms, "rounds": args.rounds, "think_ms": args.think_ms}
+    scenario = SCENARIOS[args.scenario]._replace(**{key: value for key, value in overrides.items() if value is not None})
+
+    results = asyncio.run(run(args.url, scenario, args.seed, args.server_pid, args.connect_concurrency))
+    text = json.dumps(results, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(text + "\n")
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            problems = regressions(results, json.load(file), args.tolerance)
+        for problem in problems:
+            print(f"Regression: {problem}", file=sys.stderr)
+        if problems:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
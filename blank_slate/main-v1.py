@@ -1,4 +1,3 @@
-import random
 from kivy.app import App
 from kivy.uix.screenmanager import ScreenManager, Screen
 from kivy.uix.boxlayout import BoxLayout
@@ -7,6 +6,7 @@ from kivy.uix.button import Button
 from kivy.uix.label import Label
 from kivy.uix.image import Image
 from kivy.graphics import Ellipse, Color, Line
+from phrases import PhraseCorpus
 
 class RainbowCircleWidget(BoxLayout):
     def __init__(self, **kwargs):
@@ -72,8 +72,8 @@ class MainScreen(Screen):
         self.add_widget(self.layout)
 
     def load_new_phrase(self, phrases):
-        # Select a random phrase and update the label
-        self.phrase = random.choice(phrases)
+        # Draw a phrase we haven't had yet and update the label
+        self.phrase = phrases.draw() if phrases else "No phrases available."
         self.phrase_label.text = f"Fill in the blank: {self.phrase}"
 
     def submit_answers(self, instance):
@@ -136,21 +136,21 @@ class BlankSlateApp(App):
 
     @staticmethod
     def load_phrases(file_path):
+        """A non-repeating sampler over the phrase file, or None if there are no phrases."""
         try:
             import os
             print(f"Current Working Directory: {os.getcwd()}")
             print(f"File exists: {os.path.exists(file_path)}")
 
-            with open(file_path, "r") as file:
-                phrases = [line.strip() for line in file if line.strip()]
-                if not phrases:
-                    print("Error: The file is empty!")
-                    return ["No phrases available."]
-                print(f"Phrases successfully loaded: {phrases}")
-                return phrases
+            corpus = PhraseCorpus(file_path)
+            if not len(corpus):
+                print("Error: The file is empty!")
+                return None
+            print(f"Phrases successfully loaded: {len(corpus)}")
+            return corpus.sampler()
         except FileNotFoundError:
             print(f"Error: {file_path} not found.")
-            return ["No phrases available."]
+            return None
 
 if __name__ == "__main__":
     BlankSlateApp().run()
@@ -0,0 +1,138 @@
+"""
+Quick play: players ask for a game instead of typing a room code, and the
+server groups whoever is waiting into rooms every QUICK_PLAY_TICK.
+
+Waiting players sit in one heap per skill bucket, oldest first, so enqueueing
+and taking the next player are O(log n). A bucket with a full room's worth of
+players forms rooms straight away. Players who have waited longer than
+`relax_after` are pooled across buckets and grouped by nearest skill, so
+nobody waits forever for an exact match.
+
+Skill is a player's average final score in past games (see record_scores).
+"""
+import heapq
+import itertools
+import secrets
+import time
+
+QUICK_PLAY_TICK = 0.25  # seconds between room formations
+ROOM_SIZE = 4
+SKILL_BUCKET = 5  # final-score points per skill bucket
+DEFAULT_SKILL = 10.0  # for players with no past games
+RATING_WEIGHT = 0.3  # how much the latest game moves a player's skill
+
+
+class Ticket:
+    __slots__ = ("sid", "name", "skill", "bucket", "joined_at", "cancelled")
+
+    def __init__(self, sid, name, skill, bucket, joined_at):
+        self.sid = sid
+        self.name = name
+        self.skill = skill
+        self.bucket = bucket
+        self.joined_at = joined_at
+        self.cancelled = False
+
+
+class Matchmaker:
+    def __init__(self, room_size=ROOM_SIZE, bucket_width=SKILL_BUCKET, relax_after=5.0, clock=time.monotonic):
+        self.room_size = room_size
+        self.bucket_width = bucket_width
+        self.relax_after = relax_after
+        self.clock = clock
+        self.buckets = {}  # {bucket: heap of (joined_at, seq, Ticket)}; cancelled tickets are skipped lazily
+        self.live = {}  # {bucket: waiting tickets that aren't cancelled}
+        self.tickets = {}  # {sid: Ticket} for everyone waiting
+        self.ratings = {}  # {player name: skill}
+        self.seq = itertools.count()
+
+    def __len__(self):
+        return len(self.tickets)
+
+    def enqueue(self, sid, name):
+        if sid in self.tickets:
+            return
+        skill = self.ratings.get(name, DEFAULT_SKILL)
+        ticket = Ticket(sid, name, skill, int(skill // self.bucket_width), self.clock())
+        self.push(ticket)
+        self.tickets[sid] = ticket
+
+    def push(self, ticket):
+        heapq.heappush(self.buckets.setdefault(ticket.bucket, []), (ticket.joined_at, next(self.seq), ticket))
+        self.live[ticket.bucket] = self.live.get(ticket.bucket, 0) + 1
+
+    def cancel(self, sid):
+        """Take a player out of the queue (e.g. they disconnected)."""
+        ticket = self.tickets.pop(sid, None)
+        if ticket is not None:
+            ticket.cancelled = True
+            self.live[ticket.bucket] -= 1
+
+    def oldest(self, bucket):
+        """The longest-waiting live ticket in a bucket, dropping cancelled ones on the way."""
+        heap = self.buckets[bucket]
+        while heap and heap[0][2].cancelled:
+            heapq.heappop(heap)
+        return heap[0][2] if heap else None
+
+    def pop(self, bucket):
+        self.oldest(bucket)
+        ticket = heapq.heappop(self.buckets[bucket])[2]
+        self.live[bucket] -= 1
+        del self.tickets[ticket.sid]
+        return ticket
+
+    def form_rooms(self):
+        """Group waiting players into rooms; returns a list of ticket lists, one per room."""
+        groups = []
+        for bucket in list(self.buckets):
+            while self.live[bucket] >= self.room_size:
+                groups.append([self.pop(bucket) for _ in range(self.room_size)])
+
+        # Players who waited too long are matched across buckets, nearest skill first
+        stale = []
+        cutoff = self.clock() - self.relax_after
+        for bucket in list(self.buckets):
+            while True:
+                ticket = self.oldest(bucket)
+                if ticket is None or ticket.joined_at > cutoff:
+                    break
+                stale.append(self.pop(bucket))
+            if not self.buckets[bucket]:
+                del self.buckets[bucket]
+                del self.live[bucket]
+
+        stale.sort(key=lambda ticket: ticket.skill)
+        whole = len(stale) - len(stale) % self.room_size
+        for start in range(0, whole, self.room_size):
+            groups.append(stale[start:start + self.room_size])
+        for ticket in stale[whole:]:
+            # Not enough of them yet: back in the queue, still first in line
+            self.push(ticket)
+            self.tickets[ticket.sid] = ticket
+        return groups
+
+    def record_scores(self, scores):
+        """Fold a finished game's final scores into the players' skill."""
+        for name, score in scores.items():
+            old = self.ratings.get(name)
+            self.ratings[name] = score if old is None else old + RATING_WEIGHT * (score - old)
+
+
+def new_room_code():
+    return "quick-" + secrets.token_hex(4)
+
+
+def seat_names(group):
+    """(sid, name) per ticket, with a suffix on repeated names so everyone gets a seat."""
+    used = set()
+    seats = []
+    for ticket in group:
+        name = ticket.name
+        copy = 2
+        while name in used:
+            name = f"{ticket.name} ({copy})"
+            copy += 1
+        used.add(name)
+        seats.append((ticket.sid, name))
+    return seats
@@ -0,0 +1,156 @@
+"""
+Client networking for blank slate, off the UI thread.
+
+A background thread owns the Socket.IO connection: it connects (and
+reconnects, with exponential backoff) and sends queued emits, so a slow or
+dead server never blocks the UI. Events from the server are put in a bounded
+inbox; the UI calls dispatch() once a frame to run their handlers on the UI
+thread. Bursts are coalesced as they arrive: consecutive leaderboard patches
+are merged into one, so a backlog costs one leaderboard redraw.
+
+Binary (msgpack) payloads are decoded on the Socket.IO thread by a
+wire.Unpacker, so handlers always get the JSON shapes. Once the server has
+answered a join with {"encoding": "msgpack"}, emits go out as msgpack too;
+every new connection starts over in JSON.
+
+    network = Network()
+    network.on("new_phrase", show_phrase)
+    network.connect("http://localhost:5000")
+    network.rejoin_with("join_room", {...})  # sent now and after every reconnect
+    Clock.schedule_interval(network.dispatch, 0)
+"""
+import collections
+import queue
+import random
+import threading
+
+from socketio import Client
+
+import wire
+
+INBOX_LIMIT = 256  # events waiting for the UI; past this the oldest are dropped
+RECONNECT_MIN = 0.5  # seconds before the first retry, doubling up to RECONNECT_MAX
+RECONNECT_MAX = 15.0
+CONNECT_TIMEOUT = 5
+
+
+def merge_leaderboards(earlier, later):
+    """One update_leaderboard message with the effect of both, or None if they can't be merged."""
+    if later.get("full"):
+        return later
+    if later["seq"] != earlier["seq"] + 1:
+        return None  # a gap: let the screen see it and ask for a resync
+    merged = {"scores": dict(earlier["scores"], **later["scores"]), "seq": later["seq"]}
+    if earlier.get("full"):
+        merged["full"] = True
+    else:
+        merged["base"] = earlier.get("base", earlier["seq"] - 1)  # the seq the merged patch applies on top of
+    return merged
+
+
+class Network:
+    def __init__(self, inbox_limit=INBOX_LIMIT):
+        # Reconnecting is run()'s job, with its own backoff; WirePacket reads the server's msgpack frames
+        self.sio = Client(reconnection=False, serializer=wire.WirePacket)
+        self.url = None
+        self.handlers = {}  # {event: handler}, run on the UI thread by dispatch()
+        self.inbox = collections.deque(maxlen=inbox_limit)
+        self.inbox_lock = threading.Lock()
+        self.dropped = 0  # events pushed out of a full inbox
+        self.outbox = queue.Queue()
+        self.rejoin = None  # (event, data) that puts us back in our room after a reconnect
+        self.rejoin_due = False
+        self.thread = None
+        self.closed = False
+        self.encoding = "json"  # what the server picked for this connection
+        self.unpacker = wire.Unpacker()
+        self.sio.on("encoding", self.set_encoding)
+
+    def set_encoding(self, data):
+        self.encoding = data["encoding"]
+        self.unpacker = wire.Unpacker()  # a new room, so a new name table
+
+    def on(self, event, handler):
+        """Call handler(data) on the UI thread for every `event` from the server."""
+        self.handlers[event] = handler
+        self.sio.on(event, lambda data=None: self.post(event, data))
+
+    def post(self, event, data):
+        """Queue an event for the UI (Socket.IO thread)."""
+        if isinstance(data, bytes):
+            data = self.unpacker.unpack(event, data)
+        with self.inbox_lock:
+            if event == "update_leaderboard" and self.inbox and self.inbox[-1][0] == event:
+                merged = merge_leaderboards(self.inbox[-1][1], data)
+                if merged is not None:
+                    self.inbox[-1] = (event, merged)
+                    return
+            if len(self.inbox) == self.inbox.maxlen:
+                self.dropped += 1
+            self.inbox.append((event, data))
+
+    def dispatch(self, *args):
+        """Run the handlers for everything received since the last call (UI thread, once a frame)."""
+        with self.inbox_lock:
+            if not self.inbox:
+                return
+            events = list(self.inbox)
+            self.inbox.clear()
+        for event, data in events:
+            handler = self.handlers.get(event)
+            if handler is not None:
+                handler(data)
+
+    def connect(self, url):
+        """Start connecting in the background; returns straight away."""
+        self.url = url
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, name="blank-slate-network", daemon=True)
+            self.thread.start()
+
+    def emit(self, event, data):
+        """Send an event once connected; never blocks."""
+        self.outbox.put((event, data))
+
+    def rejoin_with(self, event, data):
+        """Send this now (or once connected) and again after every reconnect."""
+        self.rejoin = (event, data)
+        self.rejoin_due = True
+
+    def run(self):
+        delay = RECONNECT_MIN
+        pending = None  # an emit that failed and goes out again after reconnecting
+        while not self.closed:
+            if not self.sio.connected:
+                self.post("connection", {"status": "connecting"})
+                try:
+                    self.sio.connect(self.url, wait_timeout=CONNECT_TIMEOUT)
+                except Exception:
+                    self.post("connection", {"status": "retrying", "seconds": delay})
+                    threading.Event().wait(delay * random.uniform(0.8, 1.2))
+                    delay = min(delay * 2, RECONNECT_MAX)
+                    continue
+                delay = RECONNECT_MIN
+                self.encoding = "json"  # until the rejoin negotiates again
+                self.rejoin_due = self.rejoin is not None
+                self.post("connection", {"status": "connected"})
+
+            try:
+                if self.rejoin_due:
+                    self.rejoin_due = False
+                    self.sio.emit(*self.rejoin)
+                if pending is None:
+                    pending = self.outbox.get(timeout=0.2)
+                event, data = pending
+                self.sio.emit(event, wire.pack_request(data) if self.encoding == "msgpack" else data)
+                pending = None
+            except queue.Empty:
+                continue
+            except Exception:
+                # Dropped mid-send; the rejoin (if any) and this emit go out again once reconnected
+                self.rejoin_due = self.rejoin is not None
+
+    def close(self):
+        self.closed = True
+        if self.sio.connected:
+            self.sio.disconnect()
@@ -0,0 +1,149 @@
+"""
+Phrase corpus for blank slate.
+
+The phrase file stays on disk, memory-mapped; in memory there is only an index
+of where each line starts and ends (two flat arrays) plus, per tag, an array of
+line numbers. Building the index means one scan of the file, so it is saved
+next to the file (<file>.idx) and reused while the file is unchanged; the
+Bulls & Cows app's indexfile.py, which its word list uses too, does that.
+
+One phrase per line, optionally followed by a tab and comma-separated tags:
+
+    black_
+    _cream<TAB>food,dessert
+
+Blank lines are skipped.
+"""
+import array
+import logging
+import mmap
+import os
+import random
+import sys
+
+BULLS_COWS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bulls_&_cows")
+sys.path.append(BULLS_COWS_DIR)  # the Bulls & Cows app's modules, shared with the server
+import indexfile  # noqa: E402
+
+INDEX_VERSION = 1
+
+logger = logging.getLogger("blank_slate.phrases")
+
+
+class PhraseCorpus:
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        self.source = indexfile.source(self.file.fileno(), INDEX_VERSION)
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if self.source["size"] else b""
+
+        self.starts = array.array("Q")  # byte offset where each phrase line starts
+        self.ends = array.array("Q")  # ... and where it ends (before the newline)
+        self.tags = {}  # {tag: array of line numbers}
+        if not self.load_index():
+            self.build_index()
+            self.save_index()
+
+    def __len__(self):
+        return len(self.starts)
+
+    @property
+    def index_path(self):
+        return self.path + ".idx"
+
+    def build_index(self):
+        data = self.data
+        size = len(data)
+        position = 0
+        while position < size:
+            end = data.find(b"\n", position)
+            if end == -1:
+                end = size
+            line_end = end
+            if line_end > position and data[line_end - 1:line_end] == b"\r":
+                line_end -= 1
+            if line_end > position and not data[position:line_end].isspace():
+                tab = data.find(b"\t", position, line_end)
+                if tab != -1:
+                    for tag in data[tab + 1:line_end].decode("utf-8").split(","):
+                        tag = tag.strip()
+                        if tag:
+                            self.tags.setdefault(tag, array.array("I")).append(len(self.starts))
+                self.starts.append(position)
+                self.ends.append(line_end)
+            position = end + 1
+
+    def save_index(self):
+        """Save the line arrays and tag arrays after a header giving their sizes."""
+        header = dict(self.source, count=len(self.starts), tags={tag: len(lines) for tag, lines in self.tags.items()})
+        indexfile.save(self.index_path, header, [self.starts, self.ends, *self.tags.values()], logger)
+
+    def load_index(self):
+        """Use the saved index if it was built from this exact file; returns whether it was."""
+        if indexfile.load(self.index_path, self.source, self.read_index):
+            return True
+        self.starts = array.array("Q")
+        self.ends = array.array("Q")
+        self.tags = {}
+        return False
+
+    def read_index(self, header, file):
+        self.starts.fromfile(file, header["count"])
+        self.ends.fromfile(file, header["count"])
+        for tag, count in header["tags"].items():
+            lines = array.array("I")
+            lines.fromfile(file, count)
+            self.tags[tag] = lines
+
+    def phrase(self, line):
+        """The phrase on (non-blank) line number `line`, without its tags."""
+        text = self.data[self.starts[line]:self.ends[line]].decode("utf-8")
+        return text.split("\t", 1)[0].strip()
+
+    def sampler(self, tag=None, rng=random):
+        """A PhraseSampler over the whole corpus, or over one tag (unknown tags mean everything)."""
+        return PhraseSampler(self, self.tags.get(tag) if tag else None, rng)
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self.file.close()
+
+
+class PhraseSampler:
+    """Draws phrases without repeats until every one has come up, then starts over.
+
+    A lazy Fisher-Yates shuffle: only the positions touched so far are stored
+    (in `swaps`), so a draw is O(1) and nothing proportional to the corpus is copied.
+    """
+
+    def __init__(self, corpus, pool=None, rng=random):
+        self.corpus = corpus
+        self.pool = pool  # line numbers to draw from, or None for every line
+        self.size = len(pool) if pool is not None else len(corpus)
+        self.rng = rng
+        self.swaps = {}
+        self.drawn = 0
+
+    def restart(self):
+        self.swaps = {}
+        self.drawn = 0
+
+    def draw(self):
+        if self.drawn == self.size:
+            self.restart()
+        i = self.drawn
+        j = self.rng.randrange(i, self.size)
+        picked = self.swaps.get(j, j)
+        self.swaps[j] = self.swaps.get(i, i)
+        self.swaps.pop(i, None)  # position i is used up
+        self.drawn += 1
+        line = self.pool[picked] if self.pool is not None else picked
+        return self.corpus.phrase(line)
+
+    def sample(self, count):
+        """Up to `count` distinct phrases (fewer if the pool is smaller)."""
+        count = min(count, self.size)
+        if self.size - self.drawn < count:
+            self.restart()  # not enough left this time round to avoid repeats
+        return [self.draw() for _ in range(count)]
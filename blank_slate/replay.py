@@ -0,0 +1,222 @@
+"""
+Replay log: every blank slate room's event stream (rooms opening, joins,
+phrase draws with their seed, answers, score deltas, players leaving and
+coming back), so any game can be reconstructed and re-scored later
+(see resimulate.py).
+
+The log is an append-only binary file. After a header (MAGIC, version,
+wall-clock start time) each record is a type byte, the milliseconds since
+the previous record, then its fields, all as unsigned varints. Strings
+(room codes, names, answers, phrases) are interned: a STRING record gives
+the next id to a piece of text and later records refer to it by id, so a
+typical answer costs a few bytes. A RESET record starts a fresh table (once
+it holds MAX_STRINGS, so neither side's memory grows without bound, and when
+a restarted server appends to the file); it also carries the milliseconds
+since the file was started, so gaps between runs keep their length.
+
+Records are built in memory and written in one go when BUFFER_BYTES have
+piled up or flush() is called (game.py does so every FLUSH_SECONDS), so the
+game never waits on the disk per event.
+"""
+import mmap
+import os
+import struct
+import time
+
+MAGIC = b"BSRL"
+VERSION = 1
+HEADER = struct.Struct("<4sBd")  # magic, version, wall-clock time the file was started
+BUFFER_BYTES = 1 << 16
+FLUSH_SECONDS = 1.0
+MAX_STRINGS = 1 << 20
+READ_WINDOW = 1 << 24  # bytes of a mapped log kept in memory behind the reader
+
+# Record types and their fields; "s" fields are strings (interned), "i" unsigned ints,
+# and a trailing "*" field repeats: a count, then that many of the pattern
+RECORDS = {
+    0: ("string", ""),  # special: a length and that many UTF-8 bytes
+    1: ("reset", ""),  # special: milliseconds since the header's start time
+    2: ("open", "sssi"),  # room, rules name, category ("" for any), capacity
+    3: ("join", "ss"),  # room, player
+    4: ("start", "si*s"),  # room, phrase sampler seed, phrases
+    5: ("answer", "sss"),  # room, player, answer as typed
+    6: ("round_end", "s*si"),  # room, (player, points) for each player who scored
+    7: ("away", "ss"),  # room, player
+    8: ("back", "ss"),
+    9: ("drop", "ss"),
+    10: ("game_over", "s"),  # room
+}
+# {name: (number, fixed fields, repeated fields)}
+TYPES = {name: (number, *fields.split("*")) if "*" in fields else (number, fields, "")
+         for number, (name, fields) in RECORDS.items()}
+
+
+def put_varint(buffer, value):
+    while value > 0x7F:
+        buffer.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+class ReplayLog:
+    """No replay log: every record is dropped. game.py uses this until use_replay() is called."""
+
+    def record(self, kind, *fields):
+        pass
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class FileReplayLog(ReplayLog):
+    def __init__(self, path, clock=time.monotonic):
+        self.path = path
+        self.clock = clock
+        self.file = open(path, "ab")
+        self.buffer = bytearray()
+        self.strings = {}
+        self.last_ms = int(clock() * 1000)
+        if self.file.tell() == 0:
+            self.started = time.time()
+            self.buffer += HEADER.pack(MAGIC, VERSION, self.started)
+        else:
+            # Appending to an older file: its string table is unknown here, so start a new one
+            with open(path, "rb") as file:
+                _, _, self.started = HEADER.unpack(file.read(HEADER.size))
+            self.reset()
+
+    def reset(self):
+        self.strings.clear()
+        self.buffer += bytes((TYPES["reset"][0], 0))
+        put_varint(self.buffer, max(0, int((time.time() - self.started) * 1000)))
+
+    def string_id(self, text):
+        string_id = self.strings.get(text)
+        if string_id is None:
+            string_id = self.strings[text] = len(self.strings)
+            data = text.encode("utf-8")
+            self.buffer += b"\0\0"  # STRING, no time passed
+            put_varint(self.buffer, len(data))
+            self.buffer += data
+        return string_id
+
+    def record(self, kind, *fields):
+        """Append one record; `fields` follow RECORDS[kind] (a repeated part is passed as one list)."""
+        number, fixed, repeated = TYPES[kind]
+        strings = self.strings
+        # At most this many new strings; reset before interning, so every id in this record is from one table
+        if len(strings) + len(fixed) + (len(fields[-1]) * len(repeated) if repeated else 0) > MAX_STRINGS:
+            self.reset()
+        # Intern the strings first: their STRING records have to come before this one
+        encoded = [(strings[value] if value in strings else self.string_id(value)) if code == "s" else value
+                   for code, value in zip(fixed, fields)]
+        if repeated:
+            items = fields[-1]
+            encoded.append(len(items))
+            for item in items:
+                item = item if isinstance(item, tuple) else (item,)
+                encoded.extend(self.string_id(value) if code == "s" else value for code, value in zip(repeated, item))
+
+        buffer = self.buffer
+        now_ms = int(self.clock() * 1000)
+        elapsed, self.last_ms = now_ms - self.last_ms, now_ms
+        buffer.append(number)
+        if 0 <= elapsed < 0x80:
+            buffer.append(elapsed)
+        else:
+            put_varint(buffer, max(0, elapsed))
+        for value in encoded:
+            if value < 0x80:
+                buffer.append(value)  # most ids and deltas fit in one byte
+            else:
+                put_varint(buffer, value)
+        if len(buffer) >= BUFFER_BYTES:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            self.file.write(self.buffer)
+            self.file.flush()
+            self.buffer = bytearray()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+
+def read(path):
+    """Every record in a log file, in order: (kind, wall-clock seconds, fields).
+
+    Fields come back as written: strings as str, a repeated part as a list
+    (of tuples when it has more than one field). A record cut short at the
+    end of the file (the server died mid-write) is left out.
+
+    The file is memory-mapped rather than read in, and the pages already
+    read are handed back every READ_WINDOW bytes, so a day's log is walked
+    in bounded memory instead of being held whole.
+    """
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size < HEADER.size:
+            raise ValueError(f"{path} is not a version {VERSION} replay log")
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            yield from read_mapped(path, data)
+
+
+def read_mapped(path, data):
+    """The records in `data`, a log file's memory map; see read()."""
+    if hasattr(mmap, "MADV_SEQUENTIAL"):
+        data.madvise(mmap.MADV_SEQUENTIAL)
+    release = hasattr(mmap, "MADV_DONTNEED")
+    released = 0  # pages before this offset have been handed back
+    magic, version, started = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a version {VERSION} replay log")
+    position = HEADER.size
+    size = len(data)
+    strings = []
+    elapsed_ms = 0
+
+    def varint():
+        nonlocal position
+        value = shift = 0
+        while True:
+            byte = data[position]
+            position += 1
+            value |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return value
+            shift += 7
+
+    try:
+        while position < size:
+            if release and position - released >= READ_WINDOW:
+                done = position - position % mmap.PAGESIZE
+                data.madvise(mmap.MADV_DONTNEED, released, done - released)
+                released = done
+            number = data[position]
+            position += 1
+            elapsed_ms += varint()
+            if number == 0:
+                length = varint()
+                strings.append(data[position:position + length].decode("utf-8"))
+                position += length
+                continue
+            if number == 1:
+                elapsed_ms = varint()
+                strings = []
+                continue
+            kind, pattern = RECORDS[number]
+            fixed, _, repeated = pattern.partition("*")
+            fields = [strings[varint()] if code == "s" else varint() for code in fixed]
+            if repeated:
+                items = []
+                for _ in range(varint()):
+                    item = tuple(strings[varint()] if code == "s" else varint() for code in repeated)
+                    items.append(item if len(item) > 1 else item[0])
+                fields.append(items)
+            yield kind, started + elapsed_ms / 1000, fields
+    except (IndexError, UnicodeDecodeError):
+        return  # the last record was cut short
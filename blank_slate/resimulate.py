@@ -0,0 +1,201 @@
+"""
+Re-simulate blank slate games from replay logs (replay.py), to settle a
+scoring dispute or to see what a scoring rule change would have done to a
+day's games.
+
+Every room is rebuilt from its records with the same Room/Round code the
+server runs: answers are canonicalized again (answers.canonical_answer,
+with --synonyms if given) and every round is scored again with
+scoring.round_deltas, under the room's own rules or --rules for all of them.
+Each rescored round is compared with the deltas the server recorded, and
+each game's winners with the ones the recorded scores gave. A game the new
+scores end early (someone reaches WINNING_SCORE sooner) stops there; one
+they would have kept going ends where the recorded game ended.
+
+Logs are read as a stream. Each file is replayed by one worker of a process
+pool (a sharded server writes one file per shard), so a day of shards
+replays on every core.
+
+    python resimulate.py replay.log.shard* --rules pairs_only --output diff.json
+    python resimulate.py replay.log --room ABCD   # one room's timeline
+"""
+import argparse
+import concurrent.futures
+import datetime
+import json
+import time
+
+import replay
+from answers import canonical_answer, load_synonyms
+from room import Room
+from scoring import RULE_SETS, round_deltas
+
+WINNING_SCORE = 25  # as in game.next_phrase
+EXAMPLES = 20  # changed games listed per file
+
+
+def winners(scores):
+    """The game's winners for these final scores, the way game.next_phrase picks them."""
+    reached = sorted(player for player, score in scores.items() if score >= WINNING_SCORE)
+    if reached:
+        return reached
+    return [max(scores, key=scores.get)] if scores else []
+
+
+class ReplayedRoom:
+    """A room as rebuilt from the log, with the scores the server recorded next to the rescored ones."""
+
+    __slots__ = ("room", "recorded", "phrase", "over")
+
+    def __init__(self, room):
+        self.room = room  # room.Room holding the rescored game
+        self.recorded = {}  # {player_name: score} from the recorded round_end deltas
+        self.phrase = 0  # index of the next phrase in room.phrases
+        self.over = False  # the rescored game has ended
+
+    def next_round(self):
+        """Move to the next phrase, or end the rescored game as game.next_phrase would."""
+        room = self.room
+        if any(score >= WINNING_SCORE for score in room.scores.values()) or self.phrase >= len(room.phrases):
+            room.round = None
+            self.over = True
+            return
+        room.new_round(room.phrases[self.phrase])
+        self.phrase += 1
+
+
+def replay_file(path, rules_name=None, synonyms=None):
+    """Replay one log file; returns its totals and the games whose winners changed."""
+    if synonyms:
+        load_synonyms(synonyms)
+    totals = {"files": 1, "records": 0, "games": 0, "rounds": 0, "answers": 0,
+              "rounds_changed": 0, "games_changed": 0}
+    changed = []
+    rooms = {}  # {room_code: ReplayedRoom}
+    started = time.perf_counter()
+    for kind, _, fields in replay.read(path):
+        totals["records"] += 1
+        code = fields[0]
+        if kind == "open":
+            _, rules, category, capacity = fields
+            rules = RULE_SETS[rules_name or rules]
+            rooms[code] = ReplayedRoom(Room(code, rules, category or None, capacity))
+            continue
+        replayed = rooms.get(code)
+        if replayed is None:
+            continue  # the room was opened before this log started
+        room = replayed.room
+
+        if kind == "join":
+            room.add_player(fields[1])
+            replayed.recorded[fields[1]] = 0
+        elif kind == "start":
+            room.phrases = fields[2]
+            replayed.phrase = 0
+            replayed.next_round()
+        elif kind == "answer":
+            totals["answers"] += 1
+            if room.round is not None:
+                room.round.submit(fields[1], canonical_answer(room.round.phrase, fields[2]))
+        elif kind == "round_end":
+            totals["rounds"] += 1
+            for player, points in fields[1]:
+                replayed.recorded[player] = replayed.recorded.get(player, 0) + points
+            if room.round is not None:
+                deltas = round_deltas(room.round.submitters_by_answer, len(room.scores), room.rules)
+                if deltas != dict(fields[1]):
+                    totals["rounds_changed"] += 1
+                room.apply_deltas(deltas)
+                replayed.next_round()
+        elif kind == "drop":
+            room.remove_player(fields[1])
+            replayed.recorded.pop(fields[1], None)
+        elif kind == "game_over":
+            totals["games"] += 1
+            before, after = winners(replayed.recorded), winners(room.scores)
+            if before != after:
+                totals["games_changed"] += 1
+                if len(changed) < EXAMPLES:
+                    changed.append({"room": code, "recorded": {"scores": replayed.recorded, "winners": before},
+                                    "replayed": {"scores": dict(room.scores), "winners": after}})
+            del rooms[code]
+        # away/back only change who a round waits for; when it ended is in the log already
+    totals["seconds"] = time.perf_counter() - started
+    return totals, changed
+
+
+def resimulate(paths, rules_name=None, synonyms=None, workers=None):
+    totals = {}
+    changed = []
+    started = time.perf_counter()
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        for file_totals, file_changed in pool.map(replay_file, paths, [rules_name] * len(paths),
+                                                  [synonyms] * len(paths)):
+            for key, value in file_totals.items():
+                totals[key] = totals.get(key, 0) + value
+            changed.extend(file_changed)
+    seconds = time.perf_counter() - started
+    totals["seconds"] = round(seconds, 3)
+    totals["records_per_second"] = round(totals["records"] / seconds) if seconds else 0
+    totals["changed_games"] = changed
+    return totals
+
+
+def timeline(paths, room_code, rules_name=None, synonyms=None):
+    """Print every record for one room, with the rescored deltas next to each recorded round_end."""
+    if synonyms:
+        load_synonyms(synonyms)
+    room = None
+    for path in paths:
+        for kind, wall, fields in replay.read(path):
+            if fields[0] != room_code:
+                continue
+            when = datetime.datetime.fromtimestamp(wall).isoformat(sep=" ", timespec="milliseconds")
+            line = f"{when}  {kind:<9} {json.dumps(fields[1:])}"
+            if kind == "open":
+                room = ReplayedRoom(Room(room_code, RULE_SETS[rules_name or fields[1]], fields[2] or None, fields[3]))
+            elif room is not None and kind == "join":
+                room.room.add_player(fields[1])
+            elif room is not None and kind == "start":
+                room.room.phrases = fields[2]
+                room.phrase = 0
+                room.next_round()
+                line += f"  -> {room.room.round.phrase!r}" if room.room.round is not None else ""
+            elif room is not None and kind == "answer" and room.room.round is not None:
+                answer = canonical_answer(room.room.round.phrase, fields[2])
+                room.room.round.submit(fields[1], answer)
+                line += f"  -> {answer!r}"
+            elif room is not None and kind == "round_end" and room.room.round is not None:
+                deltas = round_deltas(room.room.round.submitters_by_answer, len(room.room.scores), room.room.rules)
+                room.room.apply_deltas(deltas)
+                line += f"  rescored {json.dumps(deltas)}" + ("" if deltas == dict(fields[1]) else "  CHANGED")
+                room.next_round()
+            elif room is not None and kind == "drop":
+                room.room.remove_player(fields[1])
+            elif room is not None and kind == "game_over":
+                line += f"  rescored {json.dumps(room.room.scores)} winners {winners(room.room.scores)}"
+            print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("logs", nargs="+", help="replay log files (BLANK_SLATE_REPLAY, one per shard)")
+    parser.add_argument("--rules", choices=RULE_SETS, help="score every room with these rules instead of its own")
+    parser.add_argument("--synonyms", help="answer synonym table to canonicalize with (see answers.load_synonyms)")
+    parser.add_argument("--room", help="print this room's timeline instead of the totals")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--output", help="write the totals here as JSON")
+    args = parser.parse_args()
+
+    if args.room:
+        timeline(args.logs, args.room, args.rules, args.synonyms)
+        return
+    text = json.dumps(resimulate(args.logs, args.rules, args.synonyms, args.workers), indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
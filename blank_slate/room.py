@@ -0,0 +1,233 @@
+"""
+Per-room game state.
+
+Everything the handlers ask on the hot path (is this a player here, has this
+player already answered, has everyone answered) is a dict lookup or a length,
+so it stays constant-time however many people are in a room.
+"""
+import array
+import time
+
+import phrases  # noqa: F401 (puts the Bulls & Cows app's modules on sys.path)
+from scoring import DEFAULT_RULES, RULE_SETS
+from history import GuessHistory  # noqa: E402 (bulls_&_cows/history.py)
+
+
+class Round:
+    """Answers for the phrase currently on the table."""
+
+    __slots__ = ("phrase", "answers", "submitters_by_answer", "deadline")
+
+    def __init__(self, phrase):
+        self.phrase = phrase
+        self.deadline = None  # timers.Timer that ends the round if not everyone answers
+        self.answers = {}  # {player_name: answer}; its keys are the set of submitters
+        self.submitters_by_answer = {}  # {answer: [player names]}, kept up to date on submit
+
+    def has_answered(self, player_name):
+        return player_name in self.answers
+
+    def submit(self, player_name, answer):
+        """Record an answer; returns False if the player already answered this round."""
+        if player_name in self.answers:
+            return False
+        self.answers[player_name] = answer
+        self.submitters_by_answer.setdefault(answer, []).append(player_name)
+        return True
+
+    def withdraw(self, player_name):
+        """Forget a player's answer (they left the room)."""
+        answer = self.answers.pop(player_name, None)
+        if answer is not None:
+            submitters = self.submitters_by_answer[answer]
+            submitters.remove(player_name)
+            if not submitters:
+                del self.submitters_by_answer[answer]
+
+    def to_dict(self):
+        return {"phrase": self.phrase, "answers": self.answers}
+
+    @classmethod
+    def from_dict(cls, data):
+        restored = cls(data["phrase"])
+        for player_name, answer in data["answers"].items():
+            restored.submit(player_name, answer)
+        return restored
+
+
+class Room:
+    """One game room: its players (with scores), phrases and current round."""
+
+    __slots__ = ("code", "rules", "category", "capacity", "scores", "scores_seq", "phrases", "current_phrase",
+                 "round", "last_active", "phrase_sampler", "phrase_seed", "away", "last_round")
+
+    def __init__(self, code, rules=DEFAULT_RULES, category=None, capacity=4):
+        self.code = code
+        self.rules = rules  # scoring.ScoringRules for this room
+        self.category = category  # phrase tag to draw from, None for any phrase
+        self.capacity = capacity  # the game starts when this many players are seated
+        self.scores = {}  # {player_name: score}, in join order; doubles as the player index
+        self.scores_seq = 0  # sequence number of the last leaderboard message sent to the room
+        self.phrases = []
+        self.current_phrase = 0
+        self.round = None  # the round being played; None before the game starts and after it ends
+        self.last_active = time.monotonic()  # not persisted; a recovered room counts as fresh
+        self.phrase_sampler = None  # phrases.PhraseSampler, so games in a room don't repeat phrases
+        self.phrase_seed = None  # the seed of that sampler's random.Random, for the replay log
+        self.away = set()  # seated players whose connection dropped (see sessions.py); not persisted
+        self.last_round = None  # {"phrase", "leader"} of the last round played, for spectators; not persisted
+
+    def has_player(self, player_name):
+        return player_name in self.scores
+
+    def add_player(self, player_name):
+        """Seat a new player with a score of 0; returns False if they are already seated."""
+        if player_name in self.scores:
+            return False
+        self.scores[player_name] = 0
+        return True
+
+    def remove_player(self, player_name):
+        """Give up a player's seat, score and any answer this round."""
+        self.scores.pop(player_name, None)
+        self.away.discard(player_name)
+        if self.round is not None:
+            self.round.withdraw(player_name)
+
+    def new_round(self, phrase):
+        self.round = Round(phrase)
+        return self.round
+
+    def apply_deltas(self, deltas):
+        for player, points in deltas.items():
+            self.scores[player] += points
+
+    def everyone_answered(self):
+        """Every player who is here has answered (and at least one is here; away players aren't waited for)."""
+        if self.round is None:
+            return False
+        if not self.away:
+            return len(self.round.answers) == len(self.scores)
+        away_answered = sum(1 for player in self.away if player in self.round.answers)
+        present = len(self.scores) - len(self.away)
+        return present > 0 and len(self.round.answers) - away_answered == present
+
+    def cancel_timers(self):
+        if self.round is not None and self.round.deadline is not None:
+            self.round.deadline.cancel()
+
+    def to_dict(self):
+        return {
+            "code": self.code,
+            "rules": self.rules.name,
+            "category": self.category,
+            "capacity": self.capacity,
+            "scores": self.scores,
+            "scores_seq": self.scores_seq,
+            "phrases": self.phrases,
+            "current_phrase": self.current_phrase,
+            "round": self.round.to_dict() if self.round is not None else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        room = cls(data["code"], RULE_SETS.get(data["rules"], DEFAULT_RULES), data.get("category"),
+                   data.get("capacity", 4))
+        room.scores = data["scores"]
+        room.scores_seq = data["scores_seq"]
+        room.phrases = data["phrases"]
+        room.current_phrase = data["current_phrase"]
+        if data["round"] is not None:
+            room.round = Round.from_dict(data["round"])
+        return room
+
+
+class GuessRoom:
+    """A Bulls & Cows room (see bulls_cows.py): one secret word, everyone's guesses at it.
+
+    The guess history is the Bulls & Cows app's packed GuessHistory, with the
+    player of each guess (index into `scores`) in one more array, so a long
+    game costs a few bytes per guess.
+    """
+
+    __slots__ = ("code", "mode", "length", "genre", "capacity", "scores", "maker", "secret", "status", "winner",
+                 "guesses", "players", "deadline", "last_active")
+
+    def __init__(self, code, mode, length, genre=None, capacity=2):
+        self.code = code
+        self.mode = mode  # "race": everyone guesses the server's word; "duel": one player sets it, one guesses
+        self.length = length
+        self.genre = genre
+        self.capacity = capacity  # the game starts once this many players have joined
+        self.scores = {}  # {player_name: guesses made}, in join order; doubles as the player index
+        self.maker = None  # duel: the player who sets the secret
+        self.secret = None  # bytes
+        self.status = "waiting"  # waiting -> (duel: secret ->) playing -> over
+        self.winner = None
+        self.guesses = GuessHistory(length)
+        self.players = array.array("H")  # who made each guess
+        self.deadline = None  # timers.Timer that ends the game
+        self.last_active = time.monotonic()
+
+    def has_player(self, player_name):
+        return player_name in self.scores
+
+    def add_player(self, player_name):
+        if player_name in self.scores:
+            return False
+        self.scores[player_name] = 0
+        return True
+
+    def add_guess(self, player_index, guess, bulls, cows):
+        self.guesses.append(guess, bulls, cows)
+        self.players.append(player_index)
+
+    def history(self):
+        """(player name, guess, bulls, cows) for every scored guess, oldest first."""
+        names = list(self.scores)
+        for i, player_index in enumerate(self.players):
+            yield (names[player_index], *self.guesses[i])
+
+    def cancel_timers(self):
+        if self.deadline is not None:
+            self.deadline.cancel()
+
+    def to_dict(self):
+        return {
+            "game": "bulls_cows",
+            "code": self.code,
+            "mode": self.mode,
+            "length": self.length,
+            "genre": self.genre,
+            "capacity": self.capacity,
+            "scores": self.scores,
+            "maker": self.maker,
+            "secret": self.secret.decode("ascii") if self.secret is not None else None,
+            "status": self.status,
+            "winner": self.winner,
+            "letters": self.guesses.letters.tobytes().decode("ascii"),
+            "bulls": self.guesses.bulls.tolist(),
+            "cows": self.guesses.cows.tolist(),
+            "players": self.players.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        room = cls(data["code"], data["mode"], data["length"], data["genre"], data["capacity"])
+        room.scores = data["scores"]
+        room.maker = data["maker"]
+        room.secret = data["secret"].encode("ascii") if data["secret"] is not None else None
+        room.status = data["status"]
+        room.winner = data["winner"]
+        room.guesses.letters.frombytes(data["letters"].encode("ascii"))
+        room.guesses.bulls.extend(data["bulls"])
+        room.guesses.cows.extend(data["cows"])
+        room.players.extend(data["players"])
+        return room
+
+
+def room_from_dict(data):
+    """Rebuild whichever kind of room to_dict() made."""
+    if data.get("game") == "bulls_cows":
+        return GuessRoom.from_dict(data)
+    return Room.from_dict(data)
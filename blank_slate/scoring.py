@@ -0,0 +1,53 @@
+"""
+Scoring rules for a blank slate round.
+
+A round's answers are already grouped as they arrive (Round.submitters_by_answer),
+so scoring is one pass over those groups: every player in a group gets the
+points for that group's size.
+"""
+
+
+class ScoringRules:
+    """How many points each player in an answer group gets.
+
+    points_by_size maps a group size to points; bigger groups than any key get
+    crowd_points. If every player in the room gave the same answer, everyone gets
+    unanimous_points instead.
+    """
+
+    __slots__ = ("name", "points_by_size", "crowd_points", "unanimous_points")
+
+    def __init__(self, name, points_by_size, crowd_points, unanimous_points=0):
+        self.name = name
+        self.points_by_size = points_by_size
+        self.crowd_points = crowd_points
+        self.unanimous_points = unanimous_points
+
+    def points(self, group_size, player_count):
+        if group_size == player_count:
+            return self.unanimous_points
+        return self.points_by_size.get(group_size, self.crowd_points)
+
+
+RULE_SETS = {
+    # A pair scores 3, three or more score 1, a lone answer or a unanimous round scores 0
+    "classic": ScoringRules("classic", {1: 0, 2: 3}, crowd_points=1),
+    # Only an exact pair scores
+    "pairs_only": ScoringRules("pairs_only", {1: 0, 2: 3}, crowd_points=0),
+}
+DEFAULT_RULES = RULE_SETS["classic"]
+
+
+def round_deltas(submitters_by_answer, player_count, rules=DEFAULT_RULES):
+    """Points won this round, {player_name: points}, leaving out players who won nothing.
+
+    player_count is the number of players in the room, which can be more than
+    the number of answers if the round timed out.
+    """
+    deltas = {}
+    for submitters in submitters_by_answer.values():
+        points = rules.points(len(submitters), player_count)
+        if points:
+            for player in submitters:
+                deltas[player] = points
+    return deltas
@@ -0,0 +1,119 @@
+"""
+Who is playing on which connection: Socket.IO session ids <-> (room, player)
+seats, with resume tokens so a dropped client can get its seat back.
+
+This lives in the front end (frontend.py) next to the matchmaker, because
+sids belong to the process holding the sockets even when rooms are sharded.
+Every lookup is one dict access.
+
+Taking a seat hands out a token. When the connection drops, the seat is kept
+for `resume_seconds`: the game counts the player as away (see game.leave) so
+rounds don't wait for them, and a client that reconnects with the token in
+time takes the seat back, score and all. Seats whose window runs out come
+back from expire() for the game to drop.
+"""
+import collections
+import secrets
+import time
+
+RESUME_SECONDS = 120
+
+
+class Session:
+    __slots__ = ("token", "room", "name", "sid", "left_at")
+
+    def __init__(self, token, room, name, sid):
+        self.token = token
+        self.room = room
+        self.name = name
+        self.sid = sid  # None while disconnected
+        self.left_at = None
+
+
+class SessionRegistry:
+    def __init__(self, resume_seconds=RESUME_SECONDS, clock=time.monotonic):
+        self.resume_seconds = resume_seconds
+        self.clock = clock
+        self.by_sid = {}  # {sid: Session} for connected seats
+        self.by_token = {}  # {token: Session} for every seat, connected or within its resume window
+        self.by_seat = {}  # {(room_code, player_name): Session}
+        self.suspended = collections.deque()  # (expires, Session), in disconnect order
+
+    def __len__(self):
+        return len(self.by_token)
+
+    def player(self, sid):
+        """The Session on this connection, or None."""
+        return self.by_sid.get(sid)
+
+    def sid_of(self, room_code, player_name):
+        session = self.by_seat.get((room_code, player_name))
+        return session.sid if session is not None else None
+
+    def register(self, sid, room_code, player_name):
+        """Seat `sid` as a player; returns the new Session (with its token).
+
+        Whoever held the seat before (a rejoin by name, without the token) loses it.
+        """
+        old = self.by_seat.get((room_code, player_name))
+        if old is not None:
+            self.forget(old)
+        if sid in self.by_sid:
+            self.forget(self.by_sid[sid])  # one seat per connection
+        session = Session(secrets.token_urlsafe(16), room_code, player_name, sid)
+        self.by_sid[sid] = session
+        self.by_token[session.token] = session
+        self.by_seat[(room_code, player_name)] = session
+        return session
+
+    def disconnect(self, sid):
+        """The connection is gone; returns its Session, now waiting to be resumed, or None."""
+        session = self.by_sid.pop(sid, None)
+        if session is None:
+            return None
+        session.sid = None
+        session.left_at = self.clock()
+        self.suspended.append((session.left_at + self.resume_seconds, session))
+        return session
+
+    def resume(self, token, sid, room_code):
+        """Give the seat behind `token` to connection `sid`; returns the Session, or None if unknown,
+        expired or in a room other than `room_code` (nothing changes then).
+
+        If the seat still looks connected (the old socket hasn't timed out
+        yet, as on a flaky mobile network) the new connection takes it over.
+        """
+        session = self.by_token.get(token)
+        if session is None or session.room != room_code:
+            return None
+        if session.sid is None and self.clock() - session.left_at >= self.resume_seconds:
+            self.forget(session)
+            return None
+        if session.sid is not None:
+            self.by_sid.pop(session.sid, None)  # the old connection's disconnect won't find a seat
+        if sid in self.by_sid and self.by_sid[sid] is not session:
+            self.forget(self.by_sid[sid])
+        session.sid = sid
+        session.left_at = None
+        self.by_sid[sid] = session
+        return session
+
+    def expire(self):
+        """Forget seats whose resume window has run out; returns their Sessions."""
+        now = self.clock()
+        expired = []
+        while self.suspended and self.suspended[0][0] <= now:
+            _, session = self.suspended.popleft()
+            # Skip seats resumed since (or resumed and dropped again later), and ones already forgotten
+            if session.sid is None and session.left_at + self.resume_seconds <= now \
+                    and self.by_token.get(session.token) is session:
+                self.forget(session)
+                expired.append(session)
+        return expired
+
+    def forget(self, session):
+        if self.by_sid.get(session.sid) is session:
+            del self.by_sid[session.sid]
+        self.by_token.pop(session.token, None)
+        if self.by_seat.get((session.room, session.name)) is session:
+            del self.by_seat[(session.room, session.name)]
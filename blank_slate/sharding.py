@@ -0,0 +1,215 @@
+"""
+Room sharding for the blank slate server.
+
+Every room is owned by exactly one worker process, picked by hashing the room
+code, so games in different rooms run on different cores. The Socket.IO front
+end only puts sockets into Socket.IO rooms and forwards the client events in
+game.handlers (`join_room`, `submit_answer`, the Bulls & Cows events, ...) to
+the owning shard. The shard runs game.py on its own copy of
+`rooms`/`players` and sends back the events to emit, which the front end fans
+out to the room's clients.
+
+Shards talk to the front end through a MessageQueue. LocalSocketQueue is the
+built-in backend: length-prefixed JSON frames over a local socket pair, so no
+external broker is needed.
+"""
+import json
+import multiprocessing
+import queue as queue_module
+import socket
+import struct
+import threading
+import time
+import traceback
+import zlib
+
+import game
+import telemetry
+from limits import RoomBacklog
+from replay import FileReplayLog
+from store import LogRoomStore
+
+STATS_INTERVAL = 1.0  # how often a shard reports its room/player/timer counts
+
+
+def shard_for(room_code, shard_count):
+    """Stable room -> shard mapping (the same in every process and every run)."""
+    return zlib.crc32(room_code.encode("utf-8")) % shard_count
+
+
+class MessageQueue:
+    """Ordered, point-to-point message channel between two processes."""
+
+    def send(self, message):
+        raise NotImplementedError
+
+    def recv(self):
+        """Block for the next message; None once the other side has gone away."""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class LocalSocketQueue(MessageQueue):
+    """MessageQueue over a local socket, one JSON document per frame."""
+
+    HEADER = struct.Struct("!I")
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.reader = sock.makefile("rb")
+        self.send_lock = threading.Lock()  # several handlers may send at once
+
+    @classmethod
+    def pair(cls):
+        a, b = socket.socketpair()
+        return cls(a), cls(b)
+
+    def send(self, message):
+        payload = json.dumps(message, separators=(",", ":")).encode("utf-8")
+        with self.send_lock:
+            self.sock.sendall(self.HEADER.pack(len(payload)) + payload)
+
+    def recv(self):
+        header = self.reader.read(self.HEADER.size)
+        if len(header) < self.HEADER.size:
+            return None
+        (length,) = self.HEADER.unpack(header)
+        return json.loads(self.reader.read(length))
+
+    def close(self):
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)  # wakes up a blocked recv()
+        except OSError:
+            pass
+        self.sock.close()
+
+    def release(self):
+        """Drop this process's handle without hanging up on the other side."""
+        self.reader.close()
+        self.sock.close()
+
+
+def _read_into(queue, inbox):
+    while True:
+        message = queue.recv()
+        inbox.put(message)
+        if message is None:
+            break
+
+
+def run_shard(queue):
+    """Worker loop: apply forwarded events and due timers to this shard's rooms, reply with the emits.
+
+    Replies are {"emits": [...], "handled": [event, seconds, room] or None,
+    "stats": game.stats() or None}; stats only go out every STATS_INTERVAL.
+    """
+    # Messages are read on a separate thread so the loop can wake up for timers
+    inbox = queue_module.Queue()
+    threading.Thread(target=_read_into, args=(queue, inbox), daemon=True).start()
+    stats_due = 0.0
+    while True:
+        try:
+            message = inbox.get(timeout=game.timers.tick)
+        except queue_module.Empty:
+            message = {}
+        if message is None:
+            break
+        handled = None
+        if message:
+            started = time.perf_counter()
+            try:
+                game.handlers[message["event"]](message["data"])
+            except Exception:
+                # One bad request must not take the shard's other rooms down with it
+                telemetry.log("handler_failed", handler=message["event"], room=message["data"].get("room"),
+                              error=traceback.format_exc())
+            handled = [message["event"], time.perf_counter() - started, message["data"].get("room")]
+        game.timers.advance()
+
+        now = time.monotonic()
+        stats = None
+        if now >= stats_due:
+            stats = game.stats()
+            stats_due = now + STATS_INTERVAL
+        messages = game.drain()
+        if messages or handled or stats:
+            queue.send({"emits": messages, "handled": handled, "stats": stats})
+
+
+def _shard_main(index, child_end, parent_ends, store_path, replay_path):
+    # A forked worker inherits the front end's side of every queue made so far
+    for parent_end in parent_ends:
+        parent_end.release()
+    if store_path:
+        # Each shard persists its own rooms; keep the shard count fixed across restarts
+        game.use_store(LogRoomStore(f"{store_path}.shard{index}"))
+    if replay_path:
+        game.use_replay(FileReplayLog(f"{replay_path}.shard{index}"))
+    run_shard(child_end)
+    game.store.close()
+    game.replay.close()
+
+
+class ShardPool:
+    """Worker processes owning the rooms, plus the queues to reach them."""
+
+    def __init__(self, shard_count, fan_out, store_path=None, replay_path=None):
+        self.fan_out = fan_out  # fan_out(event, data, room) sends to the room's clients
+        self.queues = []
+        self.processes = []
+        self.shard_stats = {}  # {shard index: game.stats() as last reported by that shard}
+        self.backlog = RoomBacklog()  # events on their way to each room's shard
+
+        for index in range(shard_count):
+            parent_end, child_end = LocalSocketQueue.pair()
+            process = multiprocessing.Process(
+                target=_shard_main,
+                args=(index, child_end, self.queues + [parent_end], store_path, replay_path),
+                name=f"blank-slate-shard-{index}",
+                daemon=True,
+            )
+            process.start()
+            child_end.release()
+            self.queues.append(parent_end)
+            self.processes.append(process)
+
+    def submit(self, event, data):
+        """Forward a client event to the shard that owns its room."""
+        self.backlog.add(data["room"])
+        self.queues[shard_for(data["room"], len(self.queues))].send({"event": event, "data": data})
+
+    def pump(self, index):
+        """Fan out everything shard `index` emits; run one per shard as a background task."""
+        queue = self.queues[index]
+        while True:
+            reply = queue.recv()
+            if reply is None:
+                break
+            if reply["handled"]:
+                event, seconds, room = reply["handled"]
+                telemetry.handler_seconds.observe(seconds, event)
+                self.backlog.done(room)
+            if reply["stats"]:
+                self.shard_stats[index] = reply["stats"]
+            for event, data, room in reply["emits"]:
+                self.fan_out(event, data, room)
+
+    def has_room_for(self, room_code):
+        """False while the room has a full queue of events its shard hasn't got to."""
+        return self.backlog.has_room_for(room_code)
+
+    def stats(self):
+        """game.stats() summed over every shard."""
+        totals = {}
+        for stats in list(self.shard_stats.values()):
+            for key, value in stats.items():
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+    def close(self):
+        for queue in self.queues:
+            queue.close()
+        for process in self.processes:
+            process.join(timeout=1)
@@ -0,0 +1,204 @@
+"""
+Player stats across games and rooms, for both games on the server: blank
+slate totals (games, wins, points, best game) and Bulls & Cows (games, wins,
+best solve), plus global leaderboards with ranks.
+
+Stats live in SQLite (BLANK_SLATE_STATS; an in-memory database if unset)
+with one index per leaderboard, so a top-N query reads N index entries.
+Ranks come from an in-memory count of players per score (RankIndex),
+loaded from those indexes at startup, so a rank is an O(log scores) prefix
+sum however many players there are.
+
+Finished games are queued by record_game()/record_bulls_cows() and written
+by flush(), one transaction per batch; the server flushes every
+FLUSH_SECONDS, and a full batch flushes straight away. Queries read what
+has been flushed.
+"""
+import os
+import sqlite3
+
+STATS_PATH = os.environ.get("BLANK_SLATE_STATS", ":memory:")
+FLUSH_SECONDS = 2.0
+BATCH_SIZE = 1000  # queued players that trigger a flush on their own
+TOP_LIMIT = 100
+SOLVE_SECONDS = 1000  # a Bulls & Cows solve scores guesses * SOLVE_SECONDS + seconds; lower is better
+
+# {board: (column, higher is better)}
+BOARDS = {
+    "points": ("points", True),  # blank slate points over all games
+    "wins": ("wins", True),  # blank slate games won
+    "bulls_cows": ("bc_best", False),  # best Bulls & Cows solve: fewest guesses, then fastest
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS players (
+    name TEXT PRIMARY KEY,
+    games INTEGER NOT NULL,
+    wins INTEGER NOT NULL,
+    points INTEGER NOT NULL,
+    best_score INTEGER NOT NULL,
+    bc_games INTEGER NOT NULL,
+    bc_wins INTEGER NOT NULL,
+    bc_best INTEGER
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS players_by_points ON players (points DESC, name);
+CREATE INDEX IF NOT EXISTS players_by_wins ON players (wins DESC, name);
+CREATE INDEX IF NOT EXISTS players_by_bc_best ON players (bc_best, name) WHERE bc_best IS NOT NULL;
+"""
+COLUMNS = ("name", "games", "wins", "points", "best_score", "bc_games", "bc_wins", "bc_best")
+
+
+class RankIndex:
+    """How many players have each (non-negative integer) score: a Fenwick tree that grows as needed."""
+
+    def __init__(self):
+        self.tree = [0] * 1025  # 1-based; slot v + 1 counts score v
+        self.total = 0
+
+    def add(self, value, count=1):
+        while value + 1 >= len(self.tree):
+            self.grow()
+        self.total += count
+        i = value + 1
+        while i < len(self.tree):
+            self.tree[i] += count
+            i += i & -i
+
+    def grow(self):
+        # Rebuild at double the size from the counts per score
+        size = len(self.tree) - 1
+        counts = [self.at_most(v) - self.at_most(v - 1) for v in range(size)]
+        self.tree = [0] * (2 * size + 1)
+        total, self.total = self.total, 0
+        for value, count in enumerate(counts):
+            if count:
+                self.add(value, count)
+        self.total = total
+
+    def at_most(self, value):
+        """Players with a score <= value."""
+        i = min(value + 1, len(self.tree) - 1)
+        count = 0
+        while i > 0:
+            count += self.tree[i]
+            i -= i & -i
+        return count
+
+    def rank(self, value, higher_is_better):
+        """1 + players with a strictly better score (ties share a rank)."""
+        if higher_is_better:
+            return self.total - self.at_most(value) + 1
+        return self.at_most(value - 1) + 1
+
+
+class PlayerStats:
+    def __init__(self, path=STATS_PATH):
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+        self.pending = []  # [(game, player name, result)] not written yet
+        self.ranks = {}  # {board: RankIndex}
+        for board, (column, _) in BOARDS.items():
+            index = self.ranks[board] = RankIndex()
+            for value, count in self.db.execute(
+                    f"SELECT {column}, COUNT(*) FROM players WHERE {column} IS NOT NULL GROUP BY {column}"):
+                index.add(value, count)
+
+    def record_game(self, scores, winners):
+        """A blank slate game_over: {name: final score} and the winner names."""
+        winners = set(winners)
+        for name, score in scores.items():
+            self.pending.append(("blank_slate", name, (score, name in winners)))
+        if len(self.pending) >= BATCH_SIZE:
+            self.flush()
+
+    def record_bulls_cows(self, guesses, winner, solved, seconds):
+        """A Bulls & Cows game over: {name: guesses used}, the winner, and whether they solved it in `seconds`."""
+        for name, used in guesses.items():
+            solve = used * SOLVE_SECONDS + min(int(seconds), SOLVE_SECONDS - 1) if solved and name == winner else None
+            self.pending.append(("bulls_cows", name, (name == winner, solve)))
+        if len(self.pending) >= BATCH_SIZE:
+            self.flush()
+
+    def flush(self):
+        """Write everything queued in one transaction; returns how many players changed."""
+        if not self.pending:
+            return 0
+        batch, self.pending = self.pending, []
+        names = list(dict.fromkeys(name for _, name, _ in batch))
+        rows = {}
+        for start in range(0, len(names), 500):  # SQLite's bound-parameter limit
+            chunk = names[start:start + 500]
+            query = f"SELECT {', '.join(COLUMNS)} FROM players WHERE name IN ({', '.join('?' * len(chunk))})"
+            for row in self.db.execute(query, chunk):
+                rows[row[0]] = dict(zip(COLUMNS, row))
+        old = {name: dict(row) for name, row in rows.items()}
+
+        for game, name, result in batch:
+            row = rows.get(name)
+            if row is None:
+                row = rows[name] = dict(zip(COLUMNS, (name, 0, 0, 0, 0, 0, 0, None)))
+            if game == "blank_slate":
+                score, won = result
+                row["games"] += 1
+                row["wins"] += won
+                row["points"] += score
+                row["best_score"] = max(row["best_score"], score)
+            else:
+                won, solve = result
+                row["bc_games"] += 1
+                row["bc_wins"] += won
+                if solve is not None and (row["bc_best"] is None or solve < row["bc_best"]):
+                    row["bc_best"] = solve
+
+        with self.db:
+            self.db.executemany(f"INSERT OR REPLACE INTO players ({', '.join(COLUMNS)}) "
+                                f"VALUES ({', '.join('?' * len(COLUMNS))})",
+                                [tuple(row[column] for column in COLUMNS) for row in rows.values()])
+        for board, (column, _) in BOARDS.items():
+            index = self.ranks[board]
+            for name, row in rows.items():
+                before = old[name][column] if name in old else None
+                if before != row[column]:
+                    if before is not None:
+                        index.add(before, -1)
+                    if row[column] is not None:
+                        index.add(row[column])
+        return len(rows)
+
+    def player(self, name):
+        """A player's stats with their rank on every board they are on, or None if they never played."""
+        row = self.db.execute(f"SELECT {', '.join(COLUMNS)} FROM players WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            return None
+        stats = dict(zip(COLUMNS, row))
+        stats["ranks"] = {board: self.ranks[board].rank(stats[column], higher)
+                          for board, (column, higher) in BOARDS.items() if stats[column] is not None}
+        stats["bc_best"] = solve_dict(stats["bc_best"])
+        return stats
+
+    def top(self, board, limit=TOP_LIMIT):
+        """The best `limit` (1..TOP_LIMIT) players on a board: [{"rank", "name", "value"}], ties sharing a rank."""
+        column, higher = BOARDS[board]
+        limit = max(1, min(limit, TOP_LIMIT))  # SQLite reads a negative LIMIT as no limit at all
+        order = "DESC" if higher else "ASC"
+        rows = self.db.execute(f"SELECT name, {column} FROM players WHERE {column} IS NOT NULL "
+                               f"ORDER BY {column} {order}, name LIMIT ?", (limit,))
+        entries = []
+        for position, (name, value) in enumerate(rows, 1):
+            rank = entries[-1]["rank"] if entries and entries[-1]["value"] == value else position
+            entries.append({"rank": rank, "name": name, "value": value})
+        if column == "bc_best":
+            for entry in entries:
+                entry["value"] = solve_dict(entry["value"])
+        return entries
+
+    def close(self):
+        self.flush()
+        self.db.close()
+
+
+def solve_dict(solve):
+    if solve is None:
+        return None
+    guesses, seconds = divmod(solve, SOLVE_SECONDS)
+    return {"guesses": guesses, "seconds": seconds}
@@ -0,0 +1,176 @@
+"""
+Where the game keeps its rooms.
+
+game.py only touches rooms through a RoomStore: get() a room, put() it back
+after changing it, delete() it when it is done. MemoryRoomStore is the plain
+dict the server always used. LogRoomStore also writes changed rooms to an
+append-only log on a background thread and compacts that log into a snapshot
+now and then, so a restarted server picks up every game where it left off.
+"""
+import json
+import os
+import threading
+import time
+
+from room import room_from_dict
+from telemetry import log
+
+
+class RoomStore:
+    def get(self, room_code):
+        """The room with this code, or None."""
+        raise NotImplementedError
+
+    def put(self, room):
+        """Add a room, or record that it changed."""
+        raise NotImplementedError
+
+    def delete(self, room_code):
+        raise NotImplementedError
+
+    def __len__(self):
+        raise NotImplementedError
+
+    def __iter__(self):
+        """Iterate over the stored rooms."""
+        raise NotImplementedError
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class MemoryRoomStore(RoomStore):
+    def __init__(self):
+        self.rooms = {}  # {room_code: Room}
+
+    def get(self, room_code):
+        return self.rooms.get(room_code)
+
+    def put(self, room):
+        self.rooms[room.code] = room
+
+    def delete(self, room_code):
+        self.rooms.pop(room_code, None)
+
+    def __len__(self):
+        return len(self.rooms)
+
+    def __iter__(self):
+        return iter(list(self.rooms.values()))
+
+
+class LogRoomStore(MemoryRoomStore):
+    """Rooms in memory, persisted as <path>.snapshot plus an append-only <path>.log.
+
+    Both files hold one JSON room per line (or {"code": ..., "deleted": true});
+    on load the snapshot is read first and the log replayed over it, last
+    record for a room winning. put() and delete() only mark the room dirty; a
+    background thread writes all dirty rooms in one append every
+    `flush_interval` seconds, so handlers never wait on the disk. Once the log
+    holds `compact_every` records it is folded into a fresh snapshot.
+
+    Rooms are serialised at flush time, so the flusher must not run while a
+    handler is changing a room. Under eventlet the thread is a greenthread and
+    that holds; elsewhere pass background=False and call flush() from the
+    event loop every `flush_interval` instead.
+    """
+
+    def __init__(self, path, flush_interval=0.5, compact_every=10000, background=True):
+        super().__init__()
+        self.log_path = path + ".log"
+        self.snapshot_path = path + ".snapshot"
+        self.flush_interval = flush_interval
+        self.compact_every = compact_every
+        self.dirty = set()  # room codes changed since the last flush
+        self.lock = threading.Lock()
+
+        started = time.perf_counter()
+        self.log_records = self.load()
+        log("rooms_recovered", path=path, rooms=len(self.rooms), ms=round((time.perf_counter() - started) * 1000, 1))
+
+        self.log_file = open(self.log_path, "a", encoding="utf-8")
+        self.closed = False
+        if background:
+            threading.Thread(target=self.run_flusher, name="room-store-flusher", daemon=True).start()
+
+    def load(self):
+        """Rebuild self.rooms from disk; returns how many records the log holds."""
+        for line in self.read_lines(self.snapshot_path):
+            self.apply(json.loads(line))
+        log_records = 0
+        for line in self.read_lines(self.log_path):
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break  # torn write from a crash; everything after it is lost anyway
+            self.apply(record)
+            log_records += 1
+        return log_records
+
+    @staticmethod
+    def read_lines(path):
+        if not os.path.exists(path):
+            return []
+        with open(path, encoding="utf-8") as file:
+            return file.read().splitlines()
+
+    def apply(self, record):
+        if record.get("deleted"):
+            self.rooms.pop(record["code"], None)
+        else:
+            self.rooms[record["code"]] = room_from_dict(record)
+
+    def put(self, room):
+        self.rooms[room.code] = room
+        with self.lock:
+            self.dirty.add(room.code)
+
+    def delete(self, room_code):
+        self.rooms.pop(room_code, None)
+        with self.lock:
+            self.dirty.add(room_code)
+
+    def record(self, room_code):
+        room = self.rooms.get(room_code)
+        if room is None:
+            return {"code": room_code, "deleted": True}
+        return room.to_dict()
+
+    def flush(self):
+        """Append every dirty room to the log in one write."""
+        with self.lock:
+            if not self.dirty:
+                return
+            dirty, self.dirty = self.dirty, set()
+            lines = [json.dumps(self.record(room_code), separators=(",", ":")) for room_code in dirty]
+            self.log_file.write("\n".join(lines) + "\n")
+            self.log_file.flush()
+            self.log_records += len(lines)
+            if self.log_records >= self.compact_every:
+                self.compact()
+
+    def compact(self):
+        """Write every room to a new snapshot and start an empty log (lock held)."""
+        temp_path = self.snapshot_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            for room in self.rooms.values():
+                file.write(json.dumps(room.to_dict(), separators=(",", ":")) + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, self.snapshot_path)
+        self.log_file.close()
+        self.log_file = open(self.log_path, "w", encoding="utf-8")
+        self.log_records = 0
+
+    def run_flusher(self):
+        while not self.closed:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def close(self):
+        self.closed = True
+        self.flush()
+        self.log_file.close()
@@ -0,0 +1,145 @@
+"""
+Metrics and logging for the blank slate server.
+
+Metrics are plain in-process counters and fixed-bucket histograms, rendered
+in the Prometheus text format by render() (the server serves it on /metrics).
+Recording one is a dict lookup and an add, so it is cheap enough for every
+event.
+
+log() writes one JSON object per line to the "blank_slate" logger. Events
+that happen on every answer pass `sample` so only that fraction is written.
+"""
+import bisect
+import json
+import logging
+import random
+
+logger = logging.getLogger("blank_slate")
+
+
+def log(event, sample=1.0, **fields):
+    if sample < 1.0 and random.random() >= sample:
+        return
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    fields["event"] = event
+    if sample < 1.0:
+        fields["sample"] = sample
+    logger.info(json.dumps(fields, default=str))
+
+
+def _labels(label_name, label):
+    return f'{{{label_name}="{label}"}}' if label_name else ""
+
+
+class Counter:
+    def __init__(self, name, description, label_name=None):
+        self.name = name
+        self.description = description
+        self.label_name = label_name
+        self.values = {}  # {label: value}
+
+    def inc(self, label=None, amount=1):
+        self.values[label] = self.values.get(label, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        for label, value in sorted(self.values.items(), key=lambda item: str(item[0])):
+            lines.append(f"{self.name}{_labels(self.label_name, label)} {value}")
+        return lines
+
+
+class Gauge:
+    """A value read when metrics are rendered: `read()` returns a number or {label: number}."""
+
+    def __init__(self, name, description, read, label_name=None):
+        self.name = name
+        self.description = description
+        self.read = read
+        self.label_name = label_name
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} gauge"]
+        value = self.read()
+        values = value if isinstance(value, dict) else {None: value}
+        for label, value in sorted(values.items(), key=lambda item: str(item[0])):
+            lines.append(f"{self.name}{_labels(self.label_name, label)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, description, buckets, label_name=None):
+        self.name = name
+        self.description = description
+        self.buckets = buckets  # upper bounds, ascending
+        self.label_name = label_name
+        self.counts = {}  # {label: [count per bucket, plus one for +Inf]}
+        self.sums = {}
+
+    def observe(self, value, label=None):
+        counts = self.counts.get(label)
+        if counts is None:
+            counts = self.counts[label] = [0] * (len(self.buckets) + 1)
+            self.sums[label] = 0.0
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sums[label] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        for label in sorted(self.counts, key=str):
+            counts = self.counts[label]
+            prefix = f'{self.label_name}="{label}",' if self.label_name else ""
+            cumulative = 0
+            for bound, count in zip(self.buckets + [float("inf")], counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{self.name}_bucket{{{prefix}le="{le}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{_labels(self.label_name, label)} {self.sums[label]}")
+            lines.append(f"{self.name}_count{_labels(self.label_name, label)} {cumulative}")
+        return lines
+
+
+# 50 us .. ~3 s, doubling
+LATENCY_BUCKETS = [0.00005 * 2 ** i for i in range(17)]
+
+registry = []
+
+
+def register(metric):
+    registry.append(metric)
+    return metric
+
+
+def render():
+    lines = []
+    for metric in registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+handler_seconds = register(Histogram("blank_slate_handler_seconds", "Time spent in game event handlers.", LATENCY_BUCKETS, "event"))
+emits = register(Counter("blank_slate_emits_total", "Events emitted to clients.", "event"))
+emit_bytes = register(Counter("blank_slate_emit_bytes_total", "Bytes encoded for outgoing events (JSON, or msgpack for clients that asked for it).", "event"))
+rejected = register(Counter("blank_slate_rejected_total", "Client events turned away by flood control (limits.py).", "reason"))
+hub_lag_seconds = register(Histogram("blank_slate_hub_lag_seconds", "How late the event loop woke up a sleeping task.", LATENCY_BUCKETS))
+
+
+def register_room_gauges(read_stats):
+    """Rooms/players/timers gauges; read_stats() returns a dict like game.stats()."""
+    for name, description in [("rooms", "Rooms in memory."), ("players", "Players seated in those rooms."), ("timers", "Pending round/room timers.")]:
+        register(Gauge(f"blank_slate_{name}", description, lambda name=name: read_stats().get(name, 0)))
+
+
+class CountingJSON:
+    """json module stand-in for SocketIO(json=...) that counts outgoing bytes per event."""
+
+    @staticmethod
+    def dumps(obj, *args, **kwargs):
+        text = json.dumps(obj, *args, **kwargs)
+        if isinstance(obj, list) and obj and isinstance(obj[0], str):
+            emit_bytes.inc(obj[0], len(text))
+        return text
+
+    @staticmethod
+    def loads(text, *args, **kwargs):
+        return json.loads(text, *args, **kwargs)
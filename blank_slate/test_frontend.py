@@ -0,0 +1,97 @@
+"""
+Tests for frontend.py, on a transport that records its calls instead of a
+Socket.IO server: python -m pytest
+"""
+import itertools
+
+import pytest
+
+import bulls_cows  # noqa: F401 (adds the Bulls & Cows events to game.handlers)
+import frontend
+import game
+import wire
+
+codes = itertools.count()
+
+
+class RecordingTransport:
+    def __init__(self):
+        self.emitted = []  # [(event, data, room)]
+        self.rooms = {}  # {sid: set of rooms}
+
+    def emit(self, event, data, room):
+        self.emitted.append((event, data, room))
+
+    def enter(self, sid, room):
+        self.rooms.setdefault(sid, set()).add(room)
+
+    def leave(self, sid, room):
+        self.rooms.get(sid, set()).discard(room)
+
+    def events_to(self, room):
+        return [event for event, _, to in self.emitted if to == room]
+
+
+@pytest.fixture
+def front():
+    front = frontend.FrontEnd(RecordingTransport())
+    front.connect("s1", "10.0.0.1")
+    front.connect("s2", "10.0.0.2")
+    return front
+
+
+def new_code():
+    return f"front{next(codes)}"
+
+
+def test_join_room_seats_the_client(front):
+    room_code = new_code()
+    front.handle("join_room", "s1", {"room": room_code, "name": "ann", "players": 2})
+    assert room_code in front.transport.rooms["s1"]
+    assert front.sessions.player("s1").name == "ann"
+    assert front.transport.events_to("s1")[:2] == ["encoding", "session"]
+    assert "ann" in game.store.get(room_code).scores
+
+
+def test_msgpack_clients_join_the_packed_channel_and_are_forgotten_on_disconnect(front):
+    if wire.msgpack is None:
+        pytest.skip("msgpack is not installed")
+    room_code = new_code()
+    front.handle("join_room", "s1", wire.msgpack.packb({"room": room_code, "name": "ann", "players": 2,
+                                                          "encodings": ["msgpack", "json"]}))
+    assert front.transport.rooms["s1"] == {room_code + frontend.PACKED_SUFFIX}
+    assert front.packed_sids["s1"] == room_code
+    assert ("encoding", {"encoding": "msgpack"}, "s1") in front.transport.emitted
+
+    front.disconnect("s1")
+    assert "s1" not in front.packed_rooms
+    assert "s1" not in front.packed_sids
+    assert room_code not in front.packed_members
+    assert front.sessions.player("s1") is None
+
+
+def test_joining_another_room_suspends_the_old_seat(front):
+    first, second = new_code(), new_code()
+    front.handle("join_room", "s1", {"room": first, "name": "ann", "players": 2})
+    front.handle("join_room", "s1", {"room": second, "name": "ann", "players": 2})
+    assert first not in front.transport.rooms["s1"]
+    assert front.sessions.player("s1").room == second
+    assert "ann" in game.store.get(first).away
+
+
+def test_spectators_are_counted_once_per_connection(front):
+    room_code = new_code()
+    front.handle("join_room", "s1", {"room": room_code, "name": "ann", "players": 2})
+    front.handle("spectate", "s2", {"room": room_code})
+    front.handle("spectate", "s2", {"room": room_code})
+    assert front.spectators == {room_code: 1}
+    front.disconnect("s2")
+    assert front.spectators == {}
+
+
+def test_events_over_the_rate_are_rejected(front):
+    for _ in range(int(frontend.RateLimiter().connections.burst)):
+        front.handle("get_stats", "s1", {"name": "ann"})
+    front.transport.emitted.clear()
+    front.handle("get_stats", "s1", {"name": "ann"})
+    assert front.transport.events_to("s1") == ["rate_limited"]
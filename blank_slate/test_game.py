@@ -0,0 +1,65 @@
+"""
+Regression tests for game.py, run in process (no server): python -m pytest
+"""
+import itertools
+
+import game
+
+codes = itertools.count()
+
+
+def new_room(players=4):
+    """A room whose game has started, with players p0..p{players-1}; returns (room code, names)."""
+    room_code = f"test{next(codes)}"
+    names = [f"p{i}" for i in range(players)]
+    for name in names:
+        game.join({"room": room_code, "name": name, "players": players})
+    game.drain()
+    return room_code, names
+
+
+def play_round(room_code, names):
+    for name in names:
+        game.submit_answer({"room": room_code, "name": name, "answer": "cake"})
+    game.drain()
+
+
+def test_refilling_a_dropped_seat_does_not_restart_the_game():
+    room_code, names = new_room()
+    play_round(room_code, names)
+    room = game.store.get(room_code)
+    phrases, current, current_round = list(room.phrases), room.current_phrase, room.round
+
+    game.leave({"room": room_code, "name": names[-1]})
+    game.drop({"room": room_code, "name": names[-1]})
+    game.join({"room": room_code, "name": "newcomer"})
+
+    events = [event for event, _, _ in game.drain()]
+    assert "new_phrase" not in events
+    assert room.phrases == phrases
+    assert room.current_phrase == current
+    assert room.round is current_round
+    assert "newcomer" in room.scores
+
+
+def test_rejoining_by_name_does_not_restart_the_game():
+    room_code, names = new_room()
+    play_round(room_code, names)
+    room = game.store.get(room_code)
+    phrases, current, current_round = list(room.phrases), room.current_phrase, room.round
+
+    game.join({"room": room_code, "name": names[0]})  # no token, as after a server restart
+
+    assert "new_phrase" not in [event for event, _, _ in game.drain()]
+    assert room.phrases == phrases
+    assert room.current_phrase == current
+    assert room.round is current_round
+
+
+def test_game_starts_when_the_room_fills():
+    room_code = f"test{next(codes)}"
+    game.join({"room": room_code, "name": "a", "players": 2})
+    assert game.store.get(room_code).round is None
+    game.join({"room": room_code, "name": "b"})
+    assert game.store.get(room_code).round is not None
+    assert "new_phrase" in [event for event, _, _ in game.drain()]
@@ -0,0 +1,46 @@
+"""
+Write/read round trips for replay.py logs: python -m pytest
+"""
+import pytest
+
+import replay
+
+
+def write_log(path):
+    log = replay.FileReplayLog(str(path))
+    log.record("open", "ABCD", "classic", "", 4)
+    log.record("join", "ABCD", "ann")
+    log.record("start", "ABCD", 7, ["ice _", "_ cake"])
+    log.record("answer", "ABCD", "ann", "cream")
+    log.record("round_end", "ABCD", [("ann", 3)])
+    log.record("game_over", "ABCD")
+    log.close()
+
+
+def test_read_returns_the_records_written(tmp_path):
+    path = tmp_path / "replay.log"
+    write_log(path)
+    records = [(kind, fields) for kind, _, fields in replay.read(path)]
+    assert records == [
+        ("open", ["ABCD", "classic", "", 4]),
+        ("join", ["ABCD", "ann"]),
+        ("start", ["ABCD", 7, ["ice _", "_ cake"]]),
+        ("answer", ["ABCD", "ann", "cream"]),
+        ("round_end", ["ABCD", [("ann", 3)]]),
+        ("game_over", ["ABCD"]),
+    ]
+
+
+def test_read_leaves_out_a_record_cut_short(tmp_path):
+    path = tmp_path / "replay.log"
+    write_log(path)
+    data = path.read_bytes()
+    path.write_bytes(data[:-1])
+    assert [kind for kind, _, _ in replay.read(path)][-1] == "round_end"
+
+
+def test_read_rejects_other_files(tmp_path):
+    path = tmp_path / "empty.log"
+    path.write_bytes(b"")
+    with pytest.raises(ValueError):
+        list(replay.read(path))
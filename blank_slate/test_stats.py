@@ -0,0 +1,26 @@
+"""
+Tests for stats.py leaderboards, on an in-memory database: python -m pytest
+"""
+import stats
+
+
+def board_of(players):
+    player_stats = stats.PlayerStats(":memory:")
+    player_stats.record_game({f"p{i}": i for i in range(players)}, ["p0"])
+    player_stats.flush()
+    return player_stats
+
+
+def test_top_clamps_the_limit():
+    player_stats = board_of(stats.TOP_LIMIT + 5)
+    assert len(player_stats.top("points", -1)) == 1  # not SQLite's LIMIT -1, which is every row
+    assert len(player_stats.top("points", 0)) == 1
+    assert len(player_stats.top("points", 3)) == 3
+    assert len(player_stats.top("points", 10 ** 6)) == stats.TOP_LIMIT
+
+
+def test_top_ranks_ties_together():
+    player_stats = stats.PlayerStats(":memory:")
+    player_stats.record_game({"a": 5, "b": 5, "c": 1}, ["a", "b"])
+    player_stats.flush()
+    assert [(entry["rank"], entry["name"]) for entry in player_stats.top("points")] == [(1, "a"), (1, "b"), (3, "c")]
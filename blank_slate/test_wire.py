@@ -0,0 +1,43 @@
+"""
+Round trips through wire.py's msgpack encoding: python -m pytest
+"""
+import pytest
+
+import wire
+
+pytestmark = pytest.mark.skipif(wire.msgpack is None, reason="msgpack is not installed")
+
+
+def round_trip(packer, unpacker, event, data, room_code="room"):
+    return unpacker.unpack(event, packer.pack(event, data, room_code))
+
+
+def test_full_leaderboard_drops_players_who_left():
+    packer, unpacker = wire.Packer(), wire.Unpacker()
+    round_trip(packer, unpacker, "update_leaderboard", {"scores": {"a": 1, "b": 2, "c": 3}, "seq": 1, "full": True})
+    board = round_trip(packer, unpacker, "update_leaderboard", {"scores": {"a": 4, "c": 5}, "seq": 2, "full": True})
+    assert board == {"scores": {"a": 4, "c": 5}, "seq": 2, "full": True}
+
+
+def test_patch_after_a_full_leaderboard():
+    packer, unpacker = wire.Packer(), wire.Unpacker()
+    round_trip(packer, unpacker, "update_leaderboard", {"scores": {"a": 0, "b": 0, "c": 0}, "seq": 1, "full": True})
+    round_trip(packer, unpacker, "update_leaderboard", {"scores": {"a": 0, "c": 0}, "seq": 2, "full": True})
+    patch = round_trip(packer, unpacker, "update_leaderboard", {"scores": {"c": 3, "d": 1}, "seq": 3})
+    assert patch == {"scores": {"c": 3, "d": 1}, "seq": 3}
+
+
+def test_game_over_has_only_the_final_players():
+    packer, unpacker = wire.Packer(), wire.Unpacker()
+    round_trip(packer, unpacker, "update_leaderboard", {"scores": {"a": 1, "b": 2, "c": 3}, "seq": 1, "full": True})
+    over = round_trip(packer, unpacker, "game_over", {"scores": {"a": 26, "c": 3}, "winners": ["a"]})
+    assert over == {"scores": {"a": 26, "c": 3}, "winners": ["a"]}
+    over = round_trip(packer, unpacker, "game_over", {"scores": {"c": 3}, "winner": "c"})
+    assert over == {"scores": {"c": 3}, "winner": "c"}
+
+
+def test_round_end_and_new_phrase():
+    packer, unpacker = wire.Packer(), wire.Unpacker()
+    round_trip(packer, unpacker, "update_leaderboard", {"scores": {"a": 0, "b": 0}, "seq": 1, "full": True})
+    assert round_trip(packer, unpacker, "round_end", {"leader": "b", "phrase": "ice _"}) == {"leader": "b", "phrase": "ice _"}
+    assert round_trip(packer, unpacker, "new_phrase", {"phrase": "_ cake", "seconds": 60}) == {"phrase": "_ cake", "seconds": 60}
@@ -0,0 +1,100 @@
+"""
+Hierarchical timing wheel for the game's timers (round deadlines, idle rooms).
+
+All timers share one wheel and one driver loop that calls advance() every
+tick, so there is no greenthread or OS timer per timer. Scheduling and
+cancelling are O(1); advancing costs one bucket per tick plus an occasional
+cascade of a higher-level bucket into the level below.
+"""
+import math
+import time
+
+
+class Timer:
+    __slots__ = ("expires", "callback", "args", "cancelled")
+
+    def __init__(self, expires, callback, args):
+        self.expires = expires  # tick number at which the timer fires
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        """Stop the timer from firing; it is dropped when the wheel reaches it."""
+        self.cancelled = True
+
+
+class TimingWheel:
+    """`levels` wheels of `slots` buckets; a bucket on level n spans slots**n ticks.
+
+    Timers past the top level's range wait in an overflow list and are
+    re-filed every time the top level comes round.
+    """
+
+    def __init__(self, tick=0.1, slots=64, levels=4, clock=time.monotonic):
+        self.tick = tick
+        self.slots = slots
+        self.levels = levels
+        self.clock = clock
+        self.spans = [slots ** level for level in range(levels + 1)]
+        self.wheels = [[[] for _ in range(slots)] for _ in range(levels)]
+        self.overflow = []
+        self.current_tick = int(clock() / tick)
+        self.pending = 0  # scheduled and not yet fired or swept away
+
+    def __len__(self):
+        return self.pending
+
+    def schedule(self, delay, callback, *args):
+        """Call callback(*args) from advance() once `delay` seconds have passed."""
+        expires = max(math.ceil((self.clock() + delay) / self.tick), self.current_tick + 1)
+        timer = Timer(expires, callback, args)
+        self.file(timer)
+        self.pending += 1
+        return timer
+
+    def file(self, timer):
+        ticks = timer.expires - self.current_tick
+        for level in range(self.levels):
+            if ticks < self.spans[level + 1]:
+                index = (timer.expires // self.spans[level]) % self.slots
+                self.wheels[level][index].append(timer)
+                return
+        self.overflow.append(timer)
+
+    def cascade(self, level):
+        """Re-file the bucket of `level` that starts at the current tick one level down."""
+        index = (self.current_tick // self.spans[level]) % self.slots
+        bucket = self.wheels[level][index]
+        self.wheels[level][index] = []
+        for timer in bucket:
+            if timer.cancelled:
+                self.pending -= 1
+            else:
+                self.file(timer)
+
+    def advance(self, now=None):
+        """Fire every timer that is due by `now` (default: the clock); returns how many fired."""
+        target = int((self.clock() if now is None else now) / self.tick)
+        fired = 0
+        while self.current_tick < target:
+            self.current_tick += 1
+
+            if self.current_tick % self.spans[self.levels - 1] == 0 and self.overflow:
+                overflow, self.overflow = self.overflow, []
+                for timer in overflow:
+                    self.file(timer)
+            # Highest level first, so timers cascading two levels land in time
+            for level in range(self.levels - 1, 0, -1):
+                if self.current_tick % self.spans[level] == 0:
+                    self.cascade(level)
+
+            index = self.current_tick % self.slots
+            bucket = self.wheels[0][index]
+            self.wheels[0][index] = []
+            for timer in bucket:
+                self.pending -= 1
+                if not timer.cancelled:
+                    timer.callback(*timer.args)
+                    fired += 1
+        return fired
@@ -0,0 +1,182 @@
+"""
+Compact msgpack encoding of the game's events, for clients that ask for it.
+
+A client lists the encodings it understands when it joins ("encodings":
+["msgpack", "json"]) and the server answers with an "encoding" event naming
+the one it picked. JSON is always the fallback: it is what the server sends
+if msgpack isn't installed, and what a client gets if it doesn't ask.
+
+In msgpack mode an event travels as a single binary frame, [event, payload]
+in msgpack, instead of Socket.IO's text packet (a binary attachment would
+cost a second frame and a JSON header with a placeholder). WirePacket is the
+Socket.IO serializer that does this, on both ends; it encodes everything that
+isn't a Packed payload exactly like the default one, so JSON clients on the
+same server never see a binary frame.
+
+Player names are interned per room: a full leaderboard carries the room's
+name table, and from then on players travel as small integer ids, so a
+leaderboard patch is two short int arrays. A full leaderboard (and
+game_over) starts the table afresh from the players in it, so players who
+have left drop off the board just as they do for JSON clients. The short
+keys are:
+
+    update_leaderboard  full:  {"n": [names], "s": [scores by id], "q": seq, "f": 1}
+                        patch: {"i": [ids], "s": [scores], "q": seq, "a": [names added]}
+    round_end           {"l": leader id, "p": phrase}
+    game_over           {"n": [names], "s": [scores by id], "w": [winner ids], "o": true for one "winner"}
+    new_phrase          {"p": phrase, "t": seconds}
+
+Anything else is msgpack of the JSON payload as it is. unpack() turns all of
+these back into the JSON shape, so client code doesn't care which it got.
+"""
+from socketio import packet
+
+try:
+    import msgpack
+except ImportError:  # JSON only
+    msgpack = None
+
+ENCODINGS = ("msgpack", "json") if msgpack is not None else ("json",)
+
+
+class Packed(bytes):
+    """A msgpack payload, sent by WirePacket as one binary frame."""
+
+
+def frame(event, payload):
+    """The binary frame for `event` with a Packed payload: a msgpack array of the two."""
+    return b"\x92" + msgpack.packb(event) + payload
+
+
+def unframe(data):
+    """(event, Packed payload) from a frame() - the payload is left encoded."""
+    unpacker = msgpack.Unpacker(raw=False)
+    unpacker.feed(data)
+    if unpacker.read_array_header() != 2:
+        raise ValueError("not a wire frame")
+    event = unpacker.unpack()
+    return event, Packed(data[unpacker.tell():])
+
+
+class WirePacket(packet.Packet):
+    """Socket.IO serializer (Server/Client(serializer=WirePacket)) for frame()d events."""
+
+    def __init__(self, packet_type=packet.EVENT, data=None, namespace=None, id=None, binary=None,
+                 encoded_packet=None):
+        if self.is_packed(packet_type, data, namespace, id):
+            binary = False  # it is one frame, not an event with an attachment
+        super().__init__(packet_type, data, namespace, id, binary, encoded_packet)
+
+    @staticmethod
+    def is_packed(packet_type, data, namespace, id):
+        return (packet_type == packet.EVENT and id is None and namespace in (None, "/")
+                and isinstance(data, list) and len(data) == 2 and isinstance(data[1], Packed))
+
+    def encode(self):
+        if self.is_packed(self.packet_type, self.data, self.namespace, self.id):
+            return frame(*self.data)
+        return super().encode()
+
+    def decode(self, encoded_packet):
+        if not isinstance(encoded_packet, (bytes, bytearray)):
+            return super().decode(encoded_packet)
+        # Attachments of ordinary binary events never get here (Packet.add_attachment takes them)
+        self.packet_type = packet.EVENT
+        self.namespace = "/"
+        self.data = list(unframe(encoded_packet))
+        return 0
+
+
+def negotiate(offered):
+    """The first encoding in the client's list that we can speak; "json" if none."""
+    for encoding in offered or ():
+        if encoding in ENCODINGS:
+            return encoding
+    return "json"
+
+
+class Packer:
+    """Server side: encodes events for one process's rooms, keeping each room's name table."""
+
+    def __init__(self):
+        self.tables = {}  # {room_code: {player_name: id}}, ids in order of first appearance
+
+    def intern(self, room_code, names):
+        """Ids for `names`, plus the names that had to be added to the room's table."""
+        table = self.tables.setdefault(room_code, {})
+        added = [name for name in names if name not in table]
+        for name in added:
+            table[name] = len(table)
+        return [table[name] for name in names], added
+
+    def reset(self, room_code, names):
+        """Start the room's table afresh with exactly these names."""
+        self.tables[room_code] = {name: i for i, name in enumerate(names)}
+
+    def forget(self, room_code):
+        self.tables.pop(room_code, None)
+
+    def pack(self, event, data, room_code):
+        if event == "update_leaderboard":
+            if data.get("full"):
+                self.reset(room_code, list(data["scores"]))
+                message = {"n": list(data["scores"]), "s": list(data["scores"].values()), "q": data["seq"], "f": 1}
+            else:
+                ids, added = self.intern(room_code, list(data["scores"]))
+                message = {"i": ids, "s": list(data["scores"].values()), "q": data["seq"]}
+                if added:
+                    message["a"] = added
+        elif event == "round_end":
+            message = {"l": self.intern(room_code, [data["leader"]])[0][0] if data["leader"] is not None else None,
+                       "p": data["phrase"]}
+        elif event == "game_over":
+            self.reset(room_code, list(data["scores"]))
+            table = self.tables[room_code]
+            winners = data.get("winners") or ([data["winner"]] if data.get("winner") is not None else [])
+            message = {"n": list(table), "s": list(data["scores"].values()), "w": [table[name] for name in winners],
+                       "o": "winner" in data}  # one "winner", or a "winners" list
+        elif event == "new_phrase":
+            message = {"p": data["phrase"], "t": data["seconds"]}
+        else:
+            message = data
+        return Packed(msgpack.packb(message, use_bin_type=True))
+
+
+class Unpacker:
+    """Client side: turns msgpack payloads back into the JSON events, keeping the room's name table."""
+
+    def __init__(self):
+        self.names = []
+
+    def unpack(self, event, payload):
+        message = msgpack.unpackb(payload, raw=False)
+        if event == "update_leaderboard":
+            if message.get("f"):
+                self.names = list(message["n"])
+                return {"scores": dict(zip(self.names, message["s"])), "seq": message["q"], "full": True}
+            self.names.extend(message.get("a", ()))
+            return {"scores": {self.names[i]: score for i, score in zip(message["i"], message["s"])}, "seq": message["q"]}
+        if event == "round_end":
+            return {"leader": self.names[message["l"]] if message["l"] is not None else None, "phrase": message["p"]}
+        if event == "game_over":
+            self.names = list(message["n"])
+            scores = dict(zip(self.names, message["s"]))
+            winners = [self.names[i] for i in message["w"]]
+            if message["o"]:
+                return {"scores": scores, "winner": winners[0] if winners else None}
+            return {"scores": scores, "winners": winners}
+        if event == "new_phrase":
+            return {"phrase": message["p"], "seconds": message["t"]}
+        return message
+
+
+def pack_request(data):
+    """Client -> server payloads are plain msgpack of the JSON dict."""
+    return Packed(msgpack.packb(data, use_bin_type=True))
+
+
+def unpack_request(data):
+    """Server side: accept a request in either encoding."""
+    if isinstance(data, (bytes, bytearray)):
+        return msgpack.unpackb(data, raw=False)
+    return data
@@ -15,25 +15,88 @@ improve the gui and make it responsive for phone views (~media queries)
 '''
 
 
+import os
+
 import kivy
 from kivy.app import App
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.label import Label
 from kivy.uix.textinput import TextInput
 from kivy.uix.button import Button
-from kivy.uix.gridlayout import GridLayout
 from kivy.uix.popup import Popup
-from random import choice
+from kivy.uix.recycleview import RecycleView
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
+from kivy.lang import Builder
+from kivy.properties import StringProperty
+
+from history import GuessHistory
+from lexicon import Lexicon
+from rules import bulls_and_cows
 
 kivy.require('2.0.0')  # replace with your Kivy version
 
+# Words to draw and accept as guesses; point BULLS_COWS_WORDS at a bigger list if you have one
+WORD_FILE = os.environ.get("BULLS_COWS_WORDS", os.path.join(os.path.dirname(os.path.abspath(__file__)), "word_list.txt"))
+LEXICON = Lexicon(WORD_FILE)
+
+Builder.load_string('''
+<GuessRow>:
+    orientation: 'horizontal'
+    Label:
+        text: root.guess
+    Label:
+        text: root.bulls
+    Label:
+        text: root.cows
+
+<GuessHistoryView>:
+    viewclass: 'GuessRow'
+    RecycleBoxLayout:
+        orientation: 'vertical'
+        default_size: None, dp(30)
+        default_size_hint: 1, None
+        size_hint_y: None
+        height: self.minimum_height
+''')
+
+
+class GuessRow(RecycleDataViewBehavior, BoxLayout):
+    """One row of the history; the view reuses a few of these for whichever rows are on screen."""
+    guess = StringProperty("")
+    bulls = StringProperty("")
+    cows = StringProperty("")
+
+    def refresh_view_attrs(self, rv, index, data):
+        # The row's text comes straight from the packed history, not from `data`
+        guess, bulls, cows = rv.history[index]
+        self.guess, self.bulls, self.cows = guess, str(bulls), str(cows)
+        return super(GuessRow, self).refresh_view_attrs(rv, index, data)
+
+
+class GuessHistoryView(RecycleView):
+    """Scrolling guess history that only builds widgets for the rows in view."""
+
+    def __init__(self, history, **kwargs):
+        self.history = history
+        super(GuessHistoryView, self).__init__(**kwargs)
+
+    def add(self, guess, bulls, cows):
+        self.history.append(guess, bulls, cows)
+        self.data.append({})  # one placeholder per row; GuessRow reads the row from self.history
+        self.scroll_y = 0  # keep the latest guess in view
+
 class BullsAndCowsGame(App):
     def __init__(self, **kwargs):
         super(BullsAndCowsGame, self).__init__(**kwargs)
         self.secret_word = ""
         self.word_length = 0
+        self.genre = None  # only draw words of this genre, e.g. "fruit"
         self.is_code_maker = False
-        self.history_table = None
+        self.history_view = None
+        self.message_label = None
+        self.solver = None  # the computer guesser, when the player is the code maker
+        self.computer_guess = ""
+        self.computer_label = None
 
     def build(self):
         layout = BoxLayout(orientation='vertical', spacing=10, padding=10)
@@ -54,19 +117,34 @@ class BullsAndCowsGame(App):
         length_input = TextInput()
         content.add_widget(length_input)
 
+        # Optional genre
+        genre_label = Label(text="Genre (optional): " + ", ".join(LEXICON.genre_names()))
+        content.add_widget(genre_label)
+
+        genre_input = TextInput()
+        content.add_widget(genre_input)
+
         # Button to start the game
-        start_button = Button(text="Start Game", on_press=lambda x: self.start_game(length_input.text))
+        start_button = Button(text="I Guess", on_press=lambda x: self.start_game(length_input.text, genre_input.text))
         content.add_widget(start_button)
 
+        # Or think of a word and let the computer guess it
+        maker_button = Button(text="Computer Guesses", on_press=lambda x: self.start_game(length_input.text, genre_input.text, True))
+        content.add_widget(maker_button)
+
         # Create and open the popup
-        popup = Popup(title="Game Settings", content=content, size_hint=(None, None), size=(300, 200))
+        popup = Popup(title="Game Settings", content=content, size_hint=(None, None), size=(400, 350))
         popup.open()
 
-    def start_game(self, length_text):
+    def start_game(self, length_text, genre_text="", is_code_maker=False):
         try:
             self.word_length = int(length_text)
         except ValueError:
             return  # Handle invalid input
+        self.genre = genre_text.strip().lower() or None
+        if not LEXICON.count(self.word_length, self.genre):
+            return  # no words of that length and genre
+        self.is_code_maker = is_code_maker
 
         # Reset game variables
         self.secret_word = self.generate_random_word()
@@ -78,13 +156,29 @@ class BullsAndCowsGame(App):
         self.root.clear_widgets()
 
         if self.is_code_maker:
-            # Code maker's interface
-            label = Label(text="Your secret word is set. Let the code breaker guess!")
-            self.root.add_widget(label)
+            # Code maker's interface: the computer guesses the player's word
+            from solver import Solver, WordMatrix  # needs numpy, so only loaded for this mode
+            self.solver = Solver(WordMatrix(LEXICON.words(self.word_length, self.genre)))
+
+            self.computer_label = Label(text="", height=30)
+            self.root.add_widget(self.computer_label)
+
+            bulls_input = TextInput(hint_text="Bulls")
+            self.root.add_widget(bulls_input)
+            cows_input = TextInput(hint_text="Cows")
+            self.root.add_widget(cows_input)
+
+            answer_button = Button(text="Submit Answer", on_press=lambda x: self.answer_guess(bulls_input.text, cows_input.text))
+            self.root.add_widget(answer_button)
+
+            self.history_view = GuessHistoryView(GuessHistory(self.word_length), size_hint_y=3)
+            self.root.add_widget(self.history_view)
+
+            self.make_computer_guess()
         else:
             # Code breaker's interface
-            label = Label(text=f"Try to guess the {self.word_length}-letter word:",height=30)
-            self.root.add_widget(label)
+            self.message_label = Label(text=f"Try to guess the {self.word_length}-letter word:",height=30)
+            self.root.add_widget(self.message_label)
 
             guess_input = TextInput()
             self.root.add_widget(guess_input)
@@ -93,30 +187,25 @@ class BullsAndCowsGame(App):
             self.root.add_widget(guess_button)
 
             # Display table for guess history
-            self.history_table = GridLayout(cols=3, spacing=10, size_hint_y=None)
-            self.history_table.bind(minimum_height=self.history_table.setter('height'))
-            self.root.add_widget(self.history_table)
+            self.history_view = GuessHistoryView(GuessHistory(self.word_length), size_hint_y=3)
+            self.root.add_widget(self.history_view)
 
     def generate_random_word(self):
-        # replace this with a more sophisticated word generation logic
-        # words = ["cows", "word", "toes", "tail", "head", "nail"] #for 4 lettered
-        words = ["fishy", "nails", "words", "heads", "frame", "photo"] #for 5 lettered
-        # words = ["apples", "banana", "orange", "python", "finger", "game"] #for 6 lettered
-        return choice(words)
+        return LEXICON.random_word(self.word_length, self.genre)
 
     def check_guess(self, guess):
         if len(guess) != self.word_length:
             return  # Handle invalid input
+        if guess not in LEXICON:
+            self.message_label.text = f"'{guess}' is not in the word list. Try another {self.word_length}-letter word:"
+            return
+        self.message_label.text = f"Try to guess the {self.word_length}-letter word:"
+        guess = guess.lower()
 
         bulls, cows = self.calculate_bulls_and_cows(guess)
 
         # Display the guess, bulls, and cows in the table-like format
-        guess_label = Label(text=guess)
-        bulls_label = Label(text=str(bulls))
-        cows_label = Label(text=str(cows))
-        self.history_table.add_widget(guess_label)
-        self.history_table.add_widget(bulls_label)
-        self.history_table.add_widget(cows_label)
+        self.history_view.add(guess, bulls, cows)
 
         if bulls == self.word_length:
             # The word has been guessed correctly
@@ -124,10 +213,33 @@ class BullsAndCowsGame(App):
             self.root.add_widget(label)
 
     def calculate_bulls_and_cows(self, guess):
-        bulls = sum(1 for s, g in zip(self.secret_word, guess) if s == g)
-        cows = sum(min(self.secret_word.count(digit), guess.count(digit)) for digit in set(self.secret_word))
-        cows -= bulls  # Exclude bulls from cows count
-        return bulls, cows
+        return bulls_and_cows(self.secret_word, guess)
+
+    def make_computer_guess(self):
+        self.computer_guess = self.solver.next_guess()
+        if self.computer_guess is None:
+            self.computer_label.text = "No word I know fits those answers. Check your bulls and cows!"
+        else:
+            self.computer_label.text = f"Is it '{self.computer_guess}'? Enter its bulls and cows:"
+
+    def answer_guess(self, bulls_text, cows_text):
+        if not self.computer_guess:
+            return  # the game is over
+        try:
+            bulls, cows = int(bulls_text), int(cows_text)
+        except ValueError:
+            return  # Handle invalid input
+        if bulls < 0 or cows < 0 or bulls + cows > self.word_length:
+            return
+
+        self.history_view.add(self.computer_guess, bulls, cows)
+
+        if bulls == self.word_length:
+            self.computer_label.text = f"I guessed your word in {self.solver.guesses + 1} tries!"
+            self.computer_guess = ""
+            return
+        self.solver.update(self.computer_guess, bulls, cows)
+        self.make_computer_guess()
 
 if __name__ == '__main__':
     BullsAndCowsGame().run()
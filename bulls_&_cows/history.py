@@ -0,0 +1,33 @@
+"""
+Guess history for one game, packed: every guess's letters back to back in a
+byte array and its bulls and cows in two more, so a game costs a few bytes
+per guess however long it runs.
+
+The app's history view reads it, and so does the blank slate server's
+Bulls & Cows room (blank_slate/room.py GuessRoom), which stores it as is.
+"""
+import array
+
+
+class GuessHistory:
+    __slots__ = ("length", "letters", "bulls", "cows")
+
+    def __init__(self, length):
+        self.length = length
+        self.letters = array.array("B")  # guess i is letters[i * length:(i + 1) * length]
+        self.bulls = array.array("B")
+        self.cows = array.array("B")
+
+    def __len__(self):
+        return len(self.bulls)
+
+    def append(self, guess, bulls, cows):
+        """Add a guess, as str or ASCII bytes."""
+        self.letters.frombytes(guess if isinstance(guess, bytes) else guess.encode("ascii"))
+        self.bulls.append(bulls)
+        self.cows.append(cows)
+
+    def __getitem__(self, i):
+        """(guess, bulls, cows) of guess number i."""
+        guess = self.letters[i * self.length:(i + 1) * self.length].tobytes().decode("ascii")
+        return guess, self.bulls[i], self.cows[i]
@@ -0,0 +1,56 @@
+"""
+Saved indexes of text files (lexicon.py's word list, and the blank slate
+server's phrase list), so the file is only scanned when it has changed.
+
+An index lives next to its file (<file>.idx): a JSON header line, then raw
+bytes and arrays back to back, in the order and sizes the header lists. The
+header also records the file's size and modification time (and the index
+format's version), and an index is only used while those still match.
+"""
+import json
+import os
+
+
+def source(path_or_fd, version):
+    """What an index of this file records about it, to tell later whether it is still current."""
+    stat = os.stat(path_or_fd)
+    return {"version": version, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def save(index_path, header, parts, logger):
+    """Write `header` and then `parts` (bytes or array.array, in order) to index_path.
+
+    The index is written to a temporary file and renamed into place, so a
+    reader never sees half of one. Not being able to write it only costs a
+    rebuild next time, so that is logged as a warning, not raised.
+    """
+    temp_path = index_path + ".tmp"
+    try:
+        with open(temp_path, "wb") as file:
+            file.write(json.dumps(header).encode("utf-8") + b"\n")
+            for part in parts:
+                if isinstance(part, bytes):
+                    file.write(part)
+                else:
+                    part.tofile(file)
+        os.replace(temp_path, index_path)
+    except OSError as e:
+        logger.warning("Could not save index %s: %s", index_path, e)
+
+
+def load(index_path, source, read):
+    """Call read(header, file) on the saved index if it was built from this exact file; returns whether it was.
+
+    read() reads the parts after the header; running out of file (EOFError),
+    a missing key or a bad value means the index can't be used, as does a
+    missing or unreadable index file.
+    """
+    try:
+        with open(index_path, "rb") as file:
+            header = json.loads(file.readline())
+            if any(header.get(key) != value for key, value in source.items()):
+                return False
+            read(header, file)
+    except (OSError, ValueError, EOFError, KeyError):
+        return False
+    return True
@@ -0,0 +1,137 @@
+"""
+Word list for Bulls & Cows: secret words to draw and guesses to check.
+
+One word per line, optionally followed by a tab and comma-separated genres:
+
+    apple<TAB>fruit,food
+    frame
+
+The words are indexed by length: all words of one length, sorted and packed
+back to back in one bytes object (every record is `length` bytes wide), plus,
+per (length, genre), an array of positions into it. Drawing a word is one
+random position; checking a guess is a binary search over the packed records.
+Building the index means reading the whole list, so it is saved next to the
+file (<file>.idx, see indexfile.py) and reused while the file is unchanged.
+"""
+import array
+import logging
+import random
+
+import indexfile
+
+INDEX_VERSION = 1
+
+logger = logging.getLogger("bulls_cows.lexicon")
+
+
+class Lexicon:
+    def __init__(self, path):
+        self.path = path
+        self.source = indexfile.source(path, INDEX_VERSION)
+        self.packed = {}  # {length: sorted words of that length, back to back}
+        self.genres = {}  # {(length, genre): array of word positions}
+        if not self.load_index():
+            self.build_index()
+            self.save_index()
+
+    @property
+    def index_path(self):
+        return self.path + ".idx"
+
+    def build_index(self):
+        words = {}  # {word: set of genres}
+        with open(self.path, encoding="utf-8") as file:
+            for line in file:
+                word, _, genres = line.partition("\t")
+                word = word.strip().lower()
+                if not word.isascii() or not word.isalpha():
+                    continue  # blank lines, phrases, anything that can't be typed as a guess
+                words.setdefault(word, set()).update(genre.strip() for genre in genres.split(",") if genre.strip())
+
+        by_length = {}
+        for word in sorted(words):
+            by_length.setdefault(len(word), []).append(word)
+        for length, same_length in by_length.items():
+            self.packed[length] = "".join(same_length).encode("ascii")
+            for position, word in enumerate(same_length):
+                for genre in words[word]:
+                    self.genres.setdefault((length, genre), array.array("I")).append(position)
+
+    def save_index(self):
+        """Save the packed words and genre arrays after a header giving their sizes."""
+        header = dict(self.source, lengths={length: len(packed) for length, packed in self.packed.items()},
+                      genres=[[length, genre, len(positions)] for (length, genre), positions in self.genres.items()])
+        indexfile.save(self.index_path, header, [*self.packed.values(), *self.genres.values()], logger)
+
+    def load_index(self):
+        """Use the saved index if it was built from this exact file; returns whether it was."""
+        if indexfile.load(self.index_path, self.source, self.read_index):
+            return True
+        self.packed = {}
+        self.genres = {}
+        return False
+
+    def read_index(self, header, file):
+        for length, size in header["lengths"].items():
+            packed = file.read(size)
+            if len(packed) != size:
+                raise EOFError
+            self.packed[int(length)] = packed
+        for length, genre, count in header["genres"]:
+            positions = array.array("I")
+            positions.fromfile(file, count)
+            self.genres[(length, genre)] = positions
+
+    def lengths(self):
+        return sorted(self.packed)
+
+    def genre_names(self, length=None):
+        return sorted({genre for word_length, genre in self.genres if length in (None, word_length)})
+
+    def count(self, length, genre=None):
+        """How many words there are of this length (and genre)."""
+        if genre:
+            return len(self.genres.get((length, genre), ()))
+        return len(self.packed.get(length, b"")) // length if length > 0 else 0
+
+    def word(self, length, position):
+        start = position * length
+        return self.packed[length][start:start + length].decode("ascii")
+
+    def random_word(self, length, genre=None, rng=random):
+        """A random word of this length (and genre), or None if there is none."""
+        count = self.count(length, genre)
+        if not count:
+            return None
+        position = rng.randrange(count)
+        if genre:
+            position = self.genres[(length, genre)][position]
+        return self.word(length, position)
+
+    def words(self, length, genre=None):
+        """Every word of this length (and genre), in order."""
+        if genre:
+            return [self.word(length, position) for position in self.genres.get((length, genre), ())]
+        return [self.word(length, position) for position in range(self.count(length))]
+
+    def __contains__(self, word):
+        """Binary search over the packed words of the same length."""
+        try:
+            key = word.lower().encode("ascii")
+        except UnicodeEncodeError:
+            return False
+        length = len(key)
+        packed = self.packed.get(length)
+        if not packed:
+            return False
+        low, high = 0, len(packed) // length
+        while low < high:
+            middle = (low + high) // 2
+            record = packed[middle * length:(middle + 1) * length]
+            if record < key:
+                low = middle + 1
+            elif record > key:
+                high = middle
+            else:
+                return True
+        return False
@@ -0,0 +1,12 @@
+"""
+Bulls & Cows rules, without any Kivy, so the game, the computer guesser and
+anything else can share them.
+"""
+from collections import Counter
+
+
+def bulls_and_cows(secret, guess):
+    """(bulls, cows): letters in the right place, and right letters in the wrong place."""
+    bulls = sum(1 for s, g in zip(secret, guess) if s == g)
+    common = sum((Counter(secret) & Counter(guess)).values())  # letters shared, counting repeats
+    return bulls, common - bulls
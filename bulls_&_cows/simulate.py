@@ -0,0 +1,203 @@
+"""
+Headless Bulls & Cows: play lots of games between a guessing strategy and
+random secret words, to see how many guesses each word length takes.
+
+No Kivy involved. Secrets come from the same word list as the app
+(lexicon.py) and guesses are scored by the solver's vectorized
+bulls/cows, which agrees with rules.bulls_and_cows, the app's scoring.
+
+Games are split into chunks of `chunk_size`, each with its own seed derived
+from (seed, length, chunk number), and farmed out to a process pool, so the
+same seed always gives the same totals however many workers run. Finished
+chunks are folded into the totals and the totals are checkpointed to a JSON
+file every few seconds; rerunning with the same settings and checkpoint
+picks up where the last run stopped.
+
+    python simulate.py --games 1000000 --strategy random --checkpoint sim.json
+"""
+import argparse
+import concurrent.futures
+import json
+import os
+import time
+
+import numpy as np
+
+from lexicon import Lexicon
+from solver import STRATEGIES, Solver, WordMatrix
+
+DEFAULT_WORD_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "word_list.txt")
+CHECKPOINT_SECONDS = 5.0
+MAX_GUESSES = 100  # a game that takes longer than this is counted as lost
+
+matrices = {}  # {(word file, length, genre): WordMatrix}, per process
+
+
+def word_matrix(word_file, length, genre):
+    key = (word_file, length, genre)
+    if key not in matrices:
+        matrices[key] = WordMatrix(Lexicon(word_file).words(length, genre))
+    return matrices[key]
+
+
+def play(matrix, secret, strategy, seed):
+    """One game against word index `secret`; returns the number of guesses, or None if lost."""
+    solver = Solver(matrix, strategy, seed)
+    for guesses in range(1, MAX_GUESSES + 1):
+        guess = solver.next_guess()
+        if guess is None:
+            return None
+        index = matrix.index[guess]
+        if index == secret:
+            return guesses
+        code = int(solver.feedback([index], [secret])[0, 0])
+        solver.update(guess, *divmod(code, matrix.length + 1))
+    return None
+
+
+def run_chunk(config, length, chunk):
+    """Play one chunk of games; returns (length, chunk, {guesses: games}, games lost)."""
+    matrix = word_matrix(config["word_file"], length, config["genre"])
+    rng = np.random.default_rng([config["seed"], length, chunk])
+    first = chunk * config["chunk_size"]
+    games = min(config["chunk_size"], config["games"] - first)
+    histogram = {}
+    lost = 0
+    for secret, seed in zip(rng.integers(len(matrix), size=games), rng.integers(2 ** 32, size=games)):
+        guesses = play(matrix, int(secret), config["strategy"], int(seed))
+        if guesses is None:
+            lost += 1
+        else:
+            histogram[guesses] = histogram.get(guesses, 0) + 1
+    return length, chunk, histogram, lost
+
+
+def empty_totals(config):
+    return {"config": config,
+            "lengths": {str(length): {"done": [], "histogram": {}, "lost": 0} for length in config["lengths"]}}
+
+
+def load_checkpoint(path, config):
+    """Totals saved by an earlier run with the same config, or fresh ones."""
+    if path and os.path.exists(path):
+        with open(path, encoding="utf-8") as file:
+            totals = json.load(file)
+        if totals["config"] == config:
+            return totals
+        print(f"Ignoring checkpoint {path}: it was made with different settings")
+    return empty_totals(config)
+
+
+def save_checkpoint(path, totals):
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as file:
+        json.dump(totals, file)
+    os.replace(temp_path, path)
+
+
+def add_chunk(totals, length, chunk, histogram, lost):
+    entry = totals["lengths"][str(length)]
+    entry["done"].append(chunk)
+    entry["lost"] += lost
+    for guesses, games in histogram.items():
+        entry["histogram"][str(guesses)] = entry["histogram"].get(str(guesses), 0) + games
+
+
+def summary(totals):
+    """{length: {"games", "mean", "max", "lost", "histogram"}} from the totals so far."""
+    result = {}
+    for length, entry in totals["lengths"].items():
+        histogram = {int(guesses): games for guesses, games in entry["histogram"].items()}
+        played = sum(histogram.values())
+        result[int(length)] = {
+            "games": played + entry["lost"],
+            "mean": sum(guesses * games for guesses, games in histogram.items()) / played if played else None,
+            "max": max(histogram, default=None),
+            "lost": entry["lost"],
+            "histogram": dict(sorted(histogram.items())),
+        }
+    return result
+
+
+def progress_line(totals):
+    parts = []
+    for length, stats in summary(totals).items():
+        mean = f"{stats['mean']:.3f}" if stats["mean"] is not None else "-"
+        parts.append(f"{length} letters: {stats['games']} games, mean {mean}, max {stats['max']}")
+    return "; ".join(parts)
+
+
+def simulate(word_file=DEFAULT_WORD_FILE, lengths=None, genre=None, strategy="entropy", games=1000, seed=1,
+             chunk_size=1000, workers=None, checkpoint=None, progress=print):
+    """Run (or resume) a simulation; returns summary() of the finished totals.
+
+    `games` is per word length. `progress` gets a line of running stats
+    every time the checkpoint is written (pass None for silence).
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"unknown strategy {strategy!r}")
+    lexicon = Lexicon(word_file)
+    lengths = sorted(lengths or lexicon.lengths())
+    for length in lengths:
+        if not lexicon.count(length, genre):
+            raise ValueError(f"no {length}-letter words" + (f" in genre {genre!r}" if genre else ""))
+    config = {"word_file": os.path.abspath(word_file), "lengths": lengths, "genre": genre, "strategy": strategy,
+              "games": games, "seed": seed, "chunk_size": chunk_size}
+
+    totals = load_checkpoint(checkpoint, config)
+    chunks = -(-games // chunk_size)
+    done = {length: set(totals["lengths"][str(length)]["done"]) for length in lengths}
+    todo = [(length, chunk) for length in lengths for chunk in range(chunks) if chunk not in done[length]]
+
+    last_report = time.monotonic()
+    todo.reverse()
+    limit = 4 * (workers or os.cpu_count() or 1)  # chunks in flight; the rest wait their turn
+    try:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = set()
+            while todo or pending:
+                while todo and len(pending) < limit:
+                    pending.add(pool.submit(run_chunk, config, *todo.pop()))
+                finished, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in finished:
+                    add_chunk(totals, *future.result())
+                if time.monotonic() - last_report >= CHECKPOINT_SECONDS:
+                    last_report = time.monotonic()
+                    if checkpoint:
+                        save_checkpoint(checkpoint, totals)
+                    if progress:
+                        progress(progress_line(totals))
+    finally:
+        # Also on Ctrl-C, so the next run resumes from the last finished chunk
+        if checkpoint:
+            save_checkpoint(checkpoint, totals)
+    return summary(totals)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--words", default=DEFAULT_WORD_FILE, help="word list in lexicon.py format")
+    parser.add_argument("--lengths", type=int, nargs="+", help="word lengths to play (default: all in the list)")
+    parser.add_argument("--genre")
+    parser.add_argument("--strategy", choices=STRATEGIES, default="entropy")
+    parser.add_argument("--games", type=int, default=10000, help="games per word length")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--checkpoint", help="JSON file to save progress to and resume from")
+    parser.add_argument("--output", help="write the final stats here as JSON")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    results = simulate(args.words, args.lengths, args.genre, args.strategy, args.games, args.seed,
+                       args.chunk_size, args.workers, args.checkpoint)
+    text = json.dumps(results, indent=2)
+    print(text)
+    print(f"done in {time.perf_counter() - started:.1f}s")
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
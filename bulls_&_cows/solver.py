@@ -0,0 +1,210 @@
+"""
+Computer guesser for Bulls & Cows: the player thinks of a word, the computer
+guesses, the player answers with bulls and cows.
+
+Words are encoded as small integer vectors (one letter index per position,
+plus per-letter counts), so the bulls/cows of one guess against every
+remaining candidate is a handful of NumPy ops. Each answer is a single code,
+bulls * (length + 1) + cows, and the solver picks the guess that splits the
+remaining candidates best, by entropy or by minimax (smallest worst case).
+The "random" strategy guesses any word that still fits, roughly what a
+careful human does.
+
+For word lists up to TABLE_WORDS words the whole guess x secret feedback table
+is computed once and cached in BULLS_COWS_CACHE, keyed by the word list, and
+memory-mapped on later runs. Bigger word lists compute feedback on the fly.
+
+    python solver.py word_list.txt --length 5 --games 200
+"""
+import argparse
+import hashlib
+import os
+import time
+
+import numpy as np
+
+from lexicon import Lexicon
+
+CACHE_DIR = os.environ.get("BULLS_COWS_CACHE", os.path.expanduser("~/.cache/bulls_and_cows"))
+TABLE_WORDS = 12000  # 144 MB of table at most
+PAIR_BUDGET = 400000  # guess x candidate pairs scored per move
+CHUNK_CELLS = 1 << 23  # guess x candidate x letter cells per vectorized block
+
+
+class WordMatrix:
+    """Words of one length, encoded for vectorized scoring."""
+
+    def __init__(self, words):
+        self.words = sorted(set(word.lower() for word in words))
+        if not self.words:
+            raise ValueError("no words")
+        self.length = len(self.words[0])
+        if any(len(word) != self.length for word in self.words):
+            raise ValueError("all words must have the same length")
+        self.index = {word: i for i, word in enumerate(self.words)}
+        self.alphabet = sorted(set("".join(self.words)))
+        letter_ids = {letter: i for i, letter in enumerate(self.alphabet)}
+
+        # letters[i, p]: letter at position p of word i; counts[i, a]: how often letter a occurs in it
+        self.letters = np.array([[letter_ids[c] for c in word] for word in self.words], dtype=np.uint8)
+        self.counts = np.zeros((len(self.words), len(self.alphabet)), dtype=np.uint8)
+        np.add.at(self.counts, (np.arange(len(self.words))[:, None], self.letters), 1)
+
+        self.codes = (self.length + 1) ** 2  # number of possible answer codes
+        self.key = hashlib.sha1("\n".join(self.words).encode("utf-8")).hexdigest()[:16]
+        self.loaded_table = None
+
+    def __len__(self):
+        return len(self.words)
+
+    def code(self, bulls, cows):
+        return bulls * (self.length + 1) + cows
+
+    def feedback(self, guesses, secrets):
+        """Answer codes (uint8) for every guess index against every secret index."""
+        guesses = np.asarray(guesses)
+        secrets = np.asarray(secrets)
+        out = np.empty((len(guesses), len(secrets)), dtype=np.uint8)
+        step = max(1, CHUNK_CELLS // max(1, len(secrets) * max(self.length, len(self.alphabet))))
+        secret_letters = self.letters[secrets][None, :, :]
+        secret_counts = self.counts[secrets][None, :, :]
+        for start in range(0, len(guesses), step):
+            chunk = guesses[start:start + step]
+            bulls = (self.letters[chunk][:, None, :] == secret_letters).sum(axis=2, dtype=np.uint8)
+            common = np.minimum(self.counts[chunk][:, None, :], secret_counts).sum(axis=2, dtype=np.uint8)
+            out[start:start + step] = bulls * (self.length + 1) + (common - bulls)
+        return out
+
+    def table(self):
+        """The full feedback table, from the disk cache if it is there; None if too big."""
+        if len(self) > TABLE_WORDS:
+            return None
+        if self.loaded_table is not None:
+            return self.loaded_table
+        path = os.path.join(CACHE_DIR, f"feedback-{self.length}-{self.key}.npy")
+        if not os.path.exists(path):
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            table = np.lib.format.open_memmap(temp_path, mode="w+", dtype=np.uint8, shape=(len(self), len(self)))
+            everything = np.arange(len(self))
+            rows = max(1, CHUNK_CELLS // len(self))
+            for start in range(0, len(self), rows):
+                table[start:start + rows] = self.feedback(everything[start:start + rows], everything)
+            table.flush()
+            del table
+            os.replace(temp_path, path)
+        self.loaded_table = np.load(path, mmap_mode="r")
+        return self.loaded_table
+
+
+STRATEGIES = ("entropy", "minimax", "random")
+openings = {}  # {(matrix key, strategy): first guess}, the same for every game
+
+
+class Solver:
+    def __init__(self, matrix, strategy="entropy", seed=0, table=True):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"unknown strategy {strategy!r}")
+        self.matrix = matrix
+        self.strategy = strategy
+        self.rng = np.random.default_rng(seed)
+        self.table = matrix.table() if table else None
+        self.remaining = np.arange(len(matrix))  # indices of words that still fit every answer
+        self.guesses = 0
+
+    def feedback(self, guesses, secrets):
+        if self.table is not None:
+            return self.table[np.ix_(guesses, secrets)]
+        return self.matrix.feedback(guesses, secrets)
+
+    def guess_pool(self, rng):
+        """Words worth scoring this move: everything if the budget allows, else candidates plus a sample."""
+        everything = len(self.matrix)
+        remaining = len(self.remaining)
+        if everything * remaining <= PAIR_BUDGET:
+            return np.arange(everything)
+        room = PAIR_BUDGET // remaining
+        if room <= remaining:
+            return np.sort(rng.choice(self.remaining, size=max(room, 1), replace=False))
+        others = rng.choice(everything, size=min(room - remaining, everything), replace=False)
+        return np.union1d(self.remaining, others)
+
+    def best(self, pool):
+        codes = self.feedback(pool, self.remaining).astype(np.intp)
+        codes += np.arange(len(pool))[:, None] * self.matrix.codes
+        sizes = np.bincount(codes.ravel(), minlength=len(pool) * self.matrix.codes)
+        sizes = sizes.reshape(len(pool), self.matrix.codes)
+        if self.strategy == "minimax":
+            cost = sizes.max(axis=1).astype(float)
+        else:
+            # Lower expected log(partition size) = more information from the answer
+            with np.errstate(divide="ignore", invalid="ignore"):
+                cost = np.where(sizes > 0, sizes * np.log(sizes), 0.0).sum(axis=1)
+        # Ties go to words that could still be the answer
+        could_win = np.isin(pool, self.remaining)
+        return int(pool[np.lexsort((~could_win, cost))[0]])
+
+    def next_guess(self):
+        """The word to guess next, or None if no word fits the answers given."""
+        if len(self.remaining) == 0:
+            return None
+        if self.strategy == "random":
+            return self.matrix.words[self.rng.choice(self.remaining)]
+        if len(self.remaining) <= 2:
+            return self.matrix.words[self.remaining[0]]
+        if self.guesses > 0 or len(self.remaining) < len(self.matrix):
+            return self.matrix.words[self.best(self.guess_pool(self.rng))]
+
+        # Opening move: the same for every game, so worked out once (with a fixed sample)
+        opening_key = (self.matrix.key, self.strategy)
+        if opening_key not in openings:
+            openings[opening_key] = self.matrix.words[self.best(self.guess_pool(np.random.default_rng(0)))]
+        return openings[opening_key]
+
+    def update(self, guess, bulls, cows):
+        """Keep only the candidates that would have given this answer to this guess."""
+        self.guesses += 1
+        row = self.feedback([self.matrix.index[guess]], self.remaining)[0]
+        self.remaining = self.remaining[row == self.matrix.code(bulls, cows)]
+
+
+def solve(matrix, secret, strategy="entropy", seed=0):
+    """Play a whole game against `secret`; returns the list of guesses."""
+    solver = Solver(matrix, strategy, seed)
+    secret_index = matrix.index[secret]
+    played = []
+    while True:
+        guess = solver.next_guess()
+        played.append(guess)
+        if guess == secret:
+            return played
+        code = int(matrix.feedback([matrix.index[guess]], [secret_index])[0, 0])
+        solver.update(guess, *divmod(code, matrix.length + 1))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("words", help="word list in lexicon.py format")
+    parser.add_argument("--length", type=int, default=5)
+    parser.add_argument("--genre")
+    parser.add_argument("--strategy", choices=STRATEGIES, default="entropy")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    matrix = WordMatrix(Lexicon(args.words).words(args.length, args.genre))
+    matrix.table()
+    print(f"{len(matrix)} words, ready in {time.perf_counter() - started:.2f}s")
+
+    rng = np.random.default_rng(args.seed)
+    secrets = rng.choice(len(matrix), size=min(args.games, len(matrix)), replace=False)
+    started = time.perf_counter()
+    moves = [len(solve(matrix, matrix.words[i], args.strategy, args.seed)) for i in secrets]
+    elapsed = time.perf_counter() - started
+    print(f"{len(moves)} games: {np.mean(moves):.2f} guesses on average, {max(moves)} at most, "
+          f"{elapsed / sum(moves) * 1000:.2f} ms per move")
+
+
+if __name__ == "__main__":
+    main()